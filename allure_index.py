@@ -0,0 +1,284 @@
+"""Incremental index of allure-results in SQLite.
+
+    python allure_index.py ingest allure-results --build 43
+    python allure_index.py slowest -n 10
+    python allure_index.py trend <historyId>
+    python allure_index.py flaky --runs 20
+    python allure_index.py steps <historyId>
+    python allure_index.py changed
+    python allure_index.py export-history allure-results/history
+
+Each ``ingest`` only reads ``*-result.json`` files it has not seen before and
+records them as one run; a file that does not parse yet (still being written)
+is left for the next ``ingest``. Tests are told apart by historyId, not
+fullName, which every parametrization of a test shares; ``slowest``, ``flaky``
+and ``changed`` print the historyId that ``trend`` and ``steps`` take. Queries
+are plain indexed SQL, so they stay fast after months of builds.
+``export-history`` writes the history.json, history-trend.json and
+duration-trend.json files Allure reads from ``<results>/history``, so the
+report generator no longer rebuilds trends from the previous report.
+"""
+import argparse
+import json
+import sqlite3
+import sys
+import time
+from pathlib import Path
+
+DEFAULT_DB = 'allure-index.sqlite'
+HISTORY_DEPTH = 20
+STATUSES = ('failed', 'broken', 'skipped', 'passed', 'unknown')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    build_order INTEGER,
+    ingested_at REAL NOT NULL,
+    results INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS ingested_files (
+    name TEXT PRIMARY KEY
+);
+CREATE TABLE IF NOT EXISTS results (
+    uuid TEXT PRIMARY KEY,
+    run_id INTEGER NOT NULL REFERENCES runs(id),
+    history_id TEXT,
+    test_case_id TEXT,
+    full_name TEXT,
+    name TEXT,
+    status TEXT,
+    start INTEGER,
+    stop INTEGER,
+    duration INTEGER
+);
+CREATE INDEX IF NOT EXISTS results_history ON results(history_id, start);
+CREATE INDEX IF NOT EXISTS results_full_name ON results(full_name, start);
+CREATE INDEX IF NOT EXISTS results_run ON results(run_id);
+CREATE TABLE IF NOT EXISTS steps (
+    result_uuid TEXT NOT NULL REFERENCES results(uuid),
+    position INTEGER NOT NULL,
+    depth INTEGER NOT NULL,
+    name TEXT,
+    status TEXT,
+    duration INTEGER
+);
+CREATE INDEX IF NOT EXISTS steps_result ON steps(result_uuid);
+"""
+
+
+def connect(db_path=DEFAULT_DB):
+    connection = sqlite3.connect(db_path)
+    connection.row_factory = sqlite3.Row
+    connection.executescript(SCHEMA)
+    return connection
+
+
+def _duration(node):
+    start, stop = node.get('start'), node.get('stop')
+    return stop - start if start is not None and stop is not None else None
+
+
+def _flatten_steps(steps, depth=0):
+    for step in steps or ():
+        yield depth, step
+        yield from _flatten_steps(step.get('steps'), depth + 1)
+
+
+def _build_order(results_dir):
+    try:
+        return json.loads((Path(results_dir) / 'executor.json').read_text()).get('buildOrder')
+    except (OSError, ValueError):
+        return None
+
+
+def ingest(connection, results_dir, build_order=None):
+    """Index result files not seen before as one new run; returns the run id or None."""
+    seen = {row['name'] for row in connection.execute('SELECT name FROM ingested_files')}
+    parsed = []
+    for path in sorted(path for path in Path(results_dir).glob('*-result.json') if path.name not in seen):
+        try:
+            parsed.append((path.name, json.loads(path.read_text(encoding='utf-8'))))
+        except ValueError:
+            # half-written: not recorded as ingested, so the next ingest picks it up
+            continue
+    if not parsed:
+        return None
+
+    with connection:
+        run_id = connection.execute(
+            'INSERT INTO runs (build_order, ingested_at, results) VALUES (?, ?, ?)',
+            (build_order if build_order is not None else _build_order(results_dir), time.time(), len(parsed)),
+        ).lastrowid
+        results, steps = [], []
+        for _, data in parsed:
+            results.append((data['uuid'], run_id, data.get('historyId'), data.get('testCaseId'),
+                            data.get('fullName'), data.get('name'), data.get('status'),
+                            data.get('start'), data.get('stop'), _duration(data)))
+            steps.extend((data['uuid'], position, depth, step.get('name'), step.get('status'), _duration(step))
+                         for position, (depth, step) in enumerate(_flatten_steps(data.get('steps'))))
+        connection.executemany('INSERT OR IGNORE INTO results VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)', results)
+        connection.executemany('INSERT INTO steps VALUES (?, ?, ?, ?, ?, ?)', steps)
+        connection.executemany('INSERT OR IGNORE INTO ingested_files VALUES (?)', ((name,) for name, _ in parsed))
+    return run_id
+
+
+def slowest(connection, limit=10, runs=HISTORY_DEPTH):
+    return connection.execute("""
+        SELECT history_id, MAX(name) AS name, COUNT(*) AS samples, ROUND(AVG(duration)) AS avg_ms,
+               MAX(duration) AS max_ms
+        FROM results
+        WHERE run_id > (SELECT COALESCE(MAX(id), 0) FROM runs) - ? AND duration IS NOT NULL
+        GROUP BY history_id ORDER BY avg_ms DESC LIMIT ?
+    """, (runs, limit)).fetchall()
+
+
+def duration_trend(connection, history_id):
+    return connection.execute("""
+        SELECT runs.id AS run, runs.build_order, results.name, results.start, results.duration, results.status
+        FROM results JOIN runs ON runs.id = results.run_id
+        WHERE results.history_id = ?
+        ORDER BY results.start
+    """, (history_id,)).fetchall()
+
+
+def flaky(connection, runs=HISTORY_DEPTH, min_flips=1):
+    """Tests that went between passed and failed/broken within the last ``runs`` runs."""
+    return connection.execute("""
+        WITH recent AS (
+            SELECT history_id, name, status,
+                   LAG(status) OVER (PARTITION BY history_id ORDER BY start) AS previous
+            FROM results
+            WHERE run_id > (SELECT COALESCE(MAX(id), 0) FROM runs) - ?
+              AND status IN ('passed', 'failed', 'broken')
+        )
+        SELECT history_id, MAX(name) AS name, COUNT(*) AS samples,
+               SUM(previous IS NOT NULL AND (status = 'passed') != (previous = 'passed')) AS flips,
+               SUM(status != 'passed') AS failures
+        FROM recent GROUP BY history_id
+        HAVING flips >= ? ORDER BY flips DESC, failures DESC
+    """, (runs, min_flips)).fetchall()
+
+
+def step_breakdown(connection, history_id, runs=HISTORY_DEPTH):
+    return connection.execute("""
+        SELECT steps.depth, steps.name, COUNT(*) AS samples, ROUND(AVG(steps.duration), 1) AS avg_ms,
+               MAX(steps.duration) AS max_ms
+        FROM steps JOIN results ON results.uuid = steps.result_uuid
+        WHERE results.history_id = ? AND results.run_id > (SELECT COALESCE(MAX(id), 0) FROM runs) - ?
+        GROUP BY steps.depth, steps.name ORDER BY MIN(steps.position)
+    """, (history_id, runs)).fetchall()
+
+
+def changed(connection):
+    """Test cases whose status in the latest run differs from the run before, or that are new."""
+    return connection.execute("""
+        WITH ranked AS (
+            SELECT history_id, name, status, run_id,
+                   LAG(status) OVER (PARTITION BY history_id ORDER BY run_id) AS previous
+            FROM results
+        )
+        SELECT history_id, name, previous, status FROM ranked
+        WHERE run_id = (SELECT MAX(id) FROM runs) AND (previous IS NULL OR previous != status)
+    """).fetchall()
+
+
+def export_history(connection, history_dir, depth=HISTORY_DEPTH):
+    """Write Allure's history/*.json files for the next report straight from the index."""
+    history_dir = Path(history_dir)
+    history_dir.mkdir(parents=True, exist_ok=True)
+
+    history = {}
+    rows = connection.execute("""
+        SELECT * FROM (
+            SELECT uuid, history_id, status, start, stop, duration, build_order,
+                   ROW_NUMBER() OVER (PARTITION BY history_id ORDER BY start DESC) AS position
+            FROM results JOIN runs ON runs.id = results.run_id WHERE history_id IS NOT NULL
+        ) WHERE position <= ? ORDER BY history_id, start DESC
+    """, (depth,))
+    for row in rows:
+        entry = history.setdefault(row['history_id'], {'statistic': dict.fromkeys(STATUSES + ('total',), 0),
+                                                       'items': []})
+        status = row['status'] if row['status'] in STATUSES else 'unknown'
+        entry['statistic'][status] += 1
+        entry['statistic']['total'] += 1
+        item = {'uid': row['uuid'].replace('-', '')[:16], 'status': status,
+                'time': {'start': row['start'], 'stop': row['stop'], 'duration': row['duration']}}
+        if row['build_order'] is not None:
+            item['buildOrder'] = row['build_order']
+        entry['items'].append(item)
+
+    history_trend, duration_trend = [], []
+    runs = connection.execute('SELECT id, build_order FROM runs ORDER BY id DESC LIMIT ?', (depth,)).fetchall()
+    for run in runs:
+        statistic = dict.fromkeys(STATUSES + ('total',), 0)
+        for row in connection.execute('SELECT status, COUNT(*) AS n FROM results WHERE run_id = ? GROUP BY status',
+                                      (run['id'],)):
+            statistic[row['status'] if row['status'] in STATUSES else 'unknown'] += row['n']
+            statistic['total'] += row['n']
+        span = connection.execute('SELECT MAX(stop) - MIN(start) AS duration FROM results WHERE run_id = ?',
+                                  (run['id'],)).fetchone()
+        extra = {'buildOrder': run['build_order']} if run['build_order'] is not None else {}
+        history_trend.append({'data': statistic, **extra})
+        duration_trend.append({'data': {'duration': span['duration'] or 0}, **extra})
+
+    for name, payload in (('history.json', history), ('history-trend.json', history_trend),
+                          ('duration-trend.json', duration_trend)):
+        (history_dir / name).write_text(json.dumps(payload))
+    return len(history)
+
+
+def _print_rows(rows):
+    if not rows:
+        print('(no data)')
+        return
+    columns = rows[0].keys()
+    widths = [max(len(str(column)), *(len(str(row[column])) for row in rows)) for column in columns]
+    print('  '.join(str(column).ljust(width) for column, width in zip(columns, widths)))
+    for row in rows:
+        print('  '.join(str(row[column]).ljust(width) for column, width in zip(columns, widths)))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Incremental index of Allure results.')
+    parser.add_argument('--db', default=DEFAULT_DB, help='SQLite file of the index')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    command = commands.add_parser('ingest', help='Index new *-result.json files as one run')
+    command.add_argument('results_dir')
+    command.add_argument('--build', type=int, help='Build number, defaults to buildOrder from executor.json')
+    command = commands.add_parser('slowest', help='Slowest tests over the recent runs')
+    command.add_argument('-n', type=int, default=10)
+    command.add_argument('--runs', type=int, default=HISTORY_DEPTH)
+    command = commands.add_parser('trend', help='Duration trend of one test')
+    command.add_argument('history_id', help='historyId, as printed by slowest, flaky and changed')
+    command = commands.add_parser('flaky', help='Tests flipping between passed and failed')
+    command.add_argument('--runs', type=int, default=HISTORY_DEPTH)
+    command = commands.add_parser('steps', help='Step-level time breakdown of one test')
+    command.add_argument('history_id', help='historyId, as printed by slowest, flaky and changed')
+    command.add_argument('--runs', type=int, default=HISTORY_DEPTH)
+    commands.add_parser('changed', help='Test cases whose status changed in the latest run')
+    command = commands.add_parser('export-history', help="Write Allure's history/*.json from the index")
+    command.add_argument('history_dir')
+    options = parser.parse_args(argv)
+
+    connection = connect(options.db)
+    if options.command == 'ingest':
+        run_id = ingest(connection, options.results_dir, options.build)
+        print(f'run {run_id} ingested' if run_id else 'nothing new to ingest')
+    elif options.command == 'slowest':
+        _print_rows(slowest(connection, options.n, options.runs))
+    elif options.command == 'trend':
+        _print_rows(duration_trend(connection, options.history_id))
+    elif options.command == 'flaky':
+        _print_rows(flaky(connection, options.runs))
+    elif options.command == 'steps':
+        _print_rows(step_breakdown(connection, options.history_id, options.runs))
+    elif options.command == 'changed':
+        _print_rows(changed(connection))
+    elif options.command == 'export-history':
+        print(f'{export_history(connection, options.history_dir)} test cases written to {options.history_dir}')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
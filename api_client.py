@@ -0,0 +1,101 @@
+import json
+from collections import deque
+
+import requests
+
+from timing import TimedAdapter
+
+
+def request_key(method, path, json_body=None):
+    body = json.dumps(json_body, sort_keys=True) if json_body is not None else ''
+    return method.upper(), '/' + path.lstrip('/'), body
+
+
+class ApiClient:
+    base_url = 'https://reqres.in/api'
+    default_headers = {'Content-Type': 'application/json', 'Accept': 'application/json'}
+    pool_connections = 4
+    pool_maxsize = 16
+    # seconds; a backend that accepts the connection and then hangs raises Timeout instead of blocking
+    timeout = 30.0
+
+    def __init__(self, base_url=None, headers=None, pool_connections=None, pool_maxsize=None, timeout=None):
+        self.base_url = (base_url or self.base_url).rstrip('/')
+        self.timeout = timeout or self.timeout
+        self.session = requests.Session()
+        self.session.headers.update(self.default_headers)
+        if headers:
+            self.session.headers.update(headers)
+        # (owner, *request_key) -> futures of responses already in flight, see async_runner
+        self.prefetched = {}
+        # nodeid of the running test; only the test that declared a prefetch picks up its response
+        self.owner = None
+        # added to the running test's own requests only, never to sends from other threads
+        self.test_headers = {}
+        # called with every response handed to a caller, on the caller's thread
+        self.response_hooks = []
+
+        adapter = TimedAdapter(
+            pool_connections=pool_connections or self.pool_connections,
+            pool_maxsize=pool_maxsize or self.pool_maxsize,
+            pool_block=False,
+        )
+        self.mount(adapter)
+
+    def mount(self, adapter):
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+    @property
+    def adapter(self):
+        return self.session.get_adapter(self.base_url)
+
+    def url(self, path):
+        return f'{self.base_url}/{path.lstrip("/")}'
+
+    def request(self, method, path, **kwargs):
+        if self.test_headers:
+            kwargs['headers'] = {**self.test_headers, **(kwargs.get('headers') or {})}
+        pending = self.prefetched.get((self.owner, *request_key(method, path, kwargs.get('json'))))
+        response = self.receive(pending.popleft()) if pending else self.send(method, path, **kwargs)
+        self.handle_response(response)
+        return response
+
+    def handle_response(self, response):
+        """Run response_hooks; call it on the test thread for responses fetched elsewhere."""
+        for hook in self.response_hooks:
+            hook(response)
+
+    def send(self, method, path, **kwargs):
+        kwargs.setdefault('timeout', self.timeout)
+        return self.session.request(method, self.url(path), **kwargs)
+
+    def receive(self, future):
+        """Wait for a response sent on another thread."""
+        return future.result()
+
+    def add_prefetched(self, owner, method, path, future, json_body=None):
+        self.prefetched.setdefault((owner, *request_key(method, path, json_body)), deque()).append(future)
+
+    def unclaimed(self, owner):
+        """Pop the prefetched futures of owner that its test never picked up; returns (key, future) pairs."""
+        keys = [key for key in self.prefetched if key[0] == owner]
+        return [(key[1:], future) for key in keys for future in self.prefetched.pop(key)]
+
+    def get(self, path, **kwargs):
+        return self.request('GET', path, **kwargs)
+
+    def post(self, path, **kwargs):
+        return self.request('POST', path, **kwargs)
+
+    def put(self, path, **kwargs):
+        return self.request('PUT', path, **kwargs)
+
+    def patch(self, path, **kwargs):
+        return self.request('PATCH', path, **kwargs)
+
+    def delete(self, path, **kwargs):
+        return self.request('DELETE', path, **kwargs)
+
+    def close(self):
+        self.session.close()
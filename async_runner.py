@@ -0,0 +1,195 @@
+"""Opt-in async execution of independent API checks.
+
+Tests whose request does not depend on another test declare it with
+``@pytest.mark.prefetch(method, path, json=...)``. With ``--async-mode`` all of
+those requests are fired at session start on one event loop, at most
+``--async-concurrency`` at a time. The tests themselves still run through the
+normal pytest protocol, in order, and simply pick up their response from the
+pooled client, so Allure steps and attachments stay with their own test and
+producer/consumer chains keep their ordering. A prefetched response is only
+handed to the test that declared it; when that test passes without sending the
+declared request, the marker has drifted from the test body and a
+``PytestWarning`` says so.
+
+``--background-slow`` does the same for ``long_latency`` tests only: their
+requests start in the background at session start and the tests are moved to
+the end of the run, so the rest of the suite executes while they wait.
+"""
+import asyncio
+import threading
+import warnings
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+import pytest
+
+from chains import PRODUCED_KEYS
+from http_cache import NO_CACHE_HEADERS
+
+prefetch_client_key = pytest.StashKey()
+
+
+class AsyncApiClient:
+    """asyncio front end for ApiClient.
+
+    requests is blocking, so each call runs on a thread of the client's own
+    executor while the semaphore bounds how many are in flight; the
+    connections still come from the shared keep-alive pool.
+    """
+
+    def __init__(self, client, concurrency=8):
+        self.client = client
+        self.concurrency = concurrency
+        self._executor = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix='async-api')
+        self._semaphores = {}
+
+    def _semaphore(self):
+        loop = asyncio.get_running_loop()
+        if loop not in self._semaphores:
+            self._semaphores[loop] = asyncio.Semaphore(self.concurrency)
+        return self._semaphores[loop]
+
+    async def request(self, method, path, **kwargs):
+        async with self._semaphore():
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._executor, partial(self.client.send, method, path, **kwargs))
+
+    async def get(self, path, **kwargs):
+        return await self.request('GET', path, **kwargs)
+
+    async def post(self, path, **kwargs):
+        return await self.request('POST', path, **kwargs)
+
+    async def put(self, path, **kwargs):
+        return await self.request('PUT', path, **kwargs)
+
+    async def patch(self, path, **kwargs):
+        return await self.request('PATCH', path, **kwargs)
+
+    async def delete(self, path, **kwargs):
+        return await self.request('DELETE', path, **kwargs)
+
+    async def gather(self, requests):
+        """Run (method, path, kwargs) triples concurrently, results in input order."""
+        return await asyncio.gather(*(self.request(method, path, **kwargs) for method, path, kwargs in requests),
+                                    return_exceptions=True)
+
+    def close(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+class EventLoopThread:
+    """A private event loop running in a daemon thread."""
+
+    def __init__(self):
+        self.loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self.loop.run_forever, name='async-runner', daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def submit(self, coroutine):
+        return asyncio.run_coroutine_threadsafe(coroutine, self.loop)
+
+    def stop(self):
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self._thread.join()
+        self.loop.close()
+
+
+def prefetch_specs(items, long_latency_only=False):
+    for item in items:
+        if long_latency_only and item.get_closest_marker('long_latency') is None:
+            continue
+        no_cache = item.get_closest_marker('no_cache') is not None
+        for marker in item.iter_markers('prefetch'):
+            method, path = marker.args
+            kwargs = marker.kwargs
+            if no_cache:
+                kwargs = {**kwargs, 'headers': {**(kwargs.get('headers') or {}), **NO_CACHE_HEADERS}}
+            yield item.nodeid, method, path, kwargs
+
+
+def prefetch(async_client, loop_thread, specs):
+    """Start every spec on the loop and register its future with the sync client."""
+    futures = []
+    for owner, method, path, kwargs in specs:
+        future = loop_thread.submit(async_client.request(method, path, **kwargs))
+        async_client.client.add_prefetched(owner, method, path, future, json_body=kwargs.get('json'))
+        futures.append(future)
+    return futures
+
+
+def pytest_addoption(parser):
+    parser.addoption('--async-mode', action='store_true', default=False,
+                     help='Fire the requests of independent (prefetch-marked) tests concurrently up front')
+    parser.addoption('--async-concurrency', action='store', type=int, default=8,
+                     help='Max requests in flight in async mode')
+    parser.addoption('--background-slow', action='store_true', default=False,
+                     help='Start the requests of long_latency tests first and run those tests last')
+
+
+def pytest_configure(config):
+    config.addinivalue_line('markers', 'prefetch(method, path, **kwargs): the request this test sends '
+                                       'does not depend on other tests and may be issued ahead of time')
+    config.addinivalue_line('markers', 'long_latency: the test mostly waits on a slow response; with '
+                                       '--background-slow its prefetch request overlaps the rest of the run')
+
+
+def pytest_collection_modifyitems(config, items):
+    if not (config.getoption('--background-slow') or config.getoption('--async-mode')):
+        return
+    # only independent tests move: they neither publish nor consume chain values
+    slow = [item for item in items if item.get_closest_marker('long_latency') is not None
+            and item.get_closest_marker('produces') is None and 'chain' not in getattr(item, 'fixturenames', ())
+            and not set(getattr(item, 'fixturenames', ())) & PRODUCED_KEYS]
+    if slow:
+        moved = {id(item) for item in slow}
+        items[:] = [item for item in items if id(item) not in moved] + slow
+
+
+@pytest.fixture(scope='session')
+def async_api_client(request, api_client):
+    client = AsyncApiClient(api_client, concurrency=request.config.getoption('--async-concurrency'))
+    yield client
+    client.close()
+
+
+@pytest.fixture(scope='session', autouse=True)
+def async_prefetch(request):
+    async_mode = request.config.getoption('--async-mode')
+    # xdist workers already run in parallel and each collects the whole suite
+    if not (async_mode or request.config.getoption('--background-slow')) or hasattr(request.config, 'workerinput'):
+        yield
+        return
+    async_client = request.getfixturevalue('async_api_client')
+    loop_thread = EventLoopThread().start()
+    futures = prefetch(async_client, loop_thread,
+                       prefetch_specs(request.session.items, long_latency_only=not async_mode))
+    request.config.stash[prefetch_client_key] = async_client.client
+    yield
+    del request.config.stash[prefetch_client_key]
+    for future in futures:
+        future.cancel()
+    async_client.client.prefetched.clear()
+    loop_thread.stop()
+
+
+@pytest.hookimpl(hookwrapper=True)
+def pytest_runtest_call(item):
+    client = item.config.stash.get(prefetch_client_key, None)
+    if client is None:
+        yield
+        return
+    client.owner = item.nodeid
+    outcome = yield
+    client.owner = None
+    unclaimed = client.unclaimed(item.nodeid)
+    for _, future in unclaimed:
+        future.cancel()
+    if unclaimed and outcome.excinfo is None:
+        declared = ', '.join(f'{method} {path}' for (method, path, _), _ in unclaimed)
+        warnings.warn(pytest.PytestWarning(
+            f'{item.nodeid} never sent its prefetched request(s) {declared}; the prefetch marker does not '
+            f'match the request the test sends'))
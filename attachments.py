@@ -0,0 +1,134 @@
+"""Content-addressed Allure attachments written off the test thread.
+
+``attach()`` has the signature of ``allure.attach``. The attachment is still
+registered on the current step/test right away, but its file is named after
+the hash of its content, so identical bodies (e.g. every ``{}`` 404) share one
+file. Bodies above ``--attachment-max-bytes`` are truncated or gzipped, and
+the files are written by a background thread fed through a queue.
+Without ``--alluredir`` it simply defers to ``allure.attach``.
+
+PYTEST_DONT_REWRITE
+"""
+import gzip
+import hashlib
+import os
+import queue
+import threading
+from pathlib import Path
+
+import allure
+import allure_commons
+import pytest
+
+TRUNCATED_MARKER = b'\n... [truncated]'
+
+_sink = None
+
+
+class AttachmentSink:
+    def __init__(self, report_dir, max_bytes=64 * 1024, overflow='truncate'):
+        self.report_dir = Path(report_dir)
+        self.max_bytes = max_bytes
+        self.overflow = overflow
+        self.written = set()
+        self.stats = {'attached': 0, 'deduplicated': 0, 'truncated': 0, 'compressed': 0,
+                      'already_on_disk': 0, 'bytes_written': 0}
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._write_loop, name='allure-attachments', daemon=True)
+        self._thread.start()
+
+    @staticmethod
+    def _reporter():
+        for plugin in allure_commons.plugin_manager.get_plugins():
+            reporter = getattr(plugin, 'allure_logger', None)
+            if reporter is not None and hasattr(reporter, '_attach'):
+                return reporter
+        return None
+
+    def _shrink(self, body, attachment_type, extension):
+        if len(body) <= self.max_bytes:
+            return body, attachment_type, extension
+        if self.overflow == 'gzip':
+            self.stats['compressed'] += 1
+            return gzip.compress(body, mtime=0), None, f'{extension or attachment_type.extension}.gz'
+        self.stats['truncated'] += 1
+        return body[:self.max_bytes] + TRUNCATED_MARKER, allure.attachment_type.TEXT, extension
+
+    def attach(self, body, name=None, attachment_type=None, extension=None):
+        reporter = self._reporter()
+        if reporter is None:
+            allure.attach(body, name=name, attachment_type=attachment_type, extension=extension)
+            return
+        if isinstance(body, str):
+            body = body.encode('utf-8')
+        body, attachment_type, extension = self._shrink(body, attachment_type or allure.attachment_type.TEXT,
+                                                        extension)
+        digest = hashlib.sha256(body).hexdigest()[:32]
+        # the reporter names the file '<uuid>-attachment.<ext>', the digest takes the uuid's place
+        file_name = reporter._attach(digest, name=name, attachment_type=attachment_type, extension=extension)
+        self.stats['attached'] += 1
+        if file_name in self.written:
+            self.stats['deduplicated'] += 1
+            return
+        self.written.add(file_name)
+        self._queue.put((file_name, body))
+
+    def _write_loop(self):
+        while True:
+            job = self._queue.get()
+            try:
+                if job is None:
+                    return
+                file_name, body = job
+                destination = self.report_dir / file_name
+                if destination.exists():
+                    self.stats['already_on_disk'] += 1
+                    continue
+                temporary = self.report_dir / f'{file_name}.{os.getpid()}.tmp'
+                temporary.write_bytes(body)
+                os.replace(temporary, destination)
+                self.stats['bytes_written'] += len(body)
+            finally:
+                self._queue.task_done()
+
+    def flush(self):
+        self._queue.join()
+
+    def close(self):
+        self._queue.put(None)
+        self._thread.join()
+
+
+def attach(body, name=None, attachment_type=None, extension=None):
+    if _sink is None:
+        allure.attach(body, name=name, attachment_type=attachment_type, extension=extension)
+    else:
+        _sink.attach(body, name=name, attachment_type=attachment_type, extension=extension)
+
+
+def pytest_addoption(parser):
+    parser.addoption('--attachment-max-bytes', action='store', type=int, default=64 * 1024,
+                     help='Attachments above this size are truncated or compressed')
+    parser.addoption('--attachment-overflow', action='store', choices=('truncate', 'gzip'), default='truncate',
+                     help='What to do with attachments above --attachment-max-bytes')
+
+
+def pytest_configure(config):
+    global _sink
+    report_dir = getattr(config.option, 'allure_report_dir', None)
+    if report_dir:
+        _sink = AttachmentSink(report_dir, max_bytes=config.getoption('--attachment-max-bytes'),
+                               overflow=config.getoption('--attachment-overflow'))
+
+
+@pytest.hookimpl(trylast=True)
+def pytest_sessionfinish(session):
+    if _sink is not None:
+        _sink.flush()
+
+
+def pytest_unconfigure(config):
+    global _sink
+    if _sink is not None:
+        _sink.close()
+        _sink = None
@@ -0,0 +1,104 @@
+"""Session-wide auth token provider.
+
+The token is acquired lazily on first use with a single login (or register)
+call and cached with a TTL, in memory and in a JSON file guarded by an
+exclusive file lock so threads and xdist workers share one login. A 401
+invalidates the cached token and the request is retried once with a fresh one.
+"""
+import json
+import os
+import threading
+import time
+
+from locks import file_lock
+
+DEFAULT_CREDENTIALS = {'email': 'eve.holt@reqres.in', 'password': 'cityslicka'}
+
+
+class AuthProvider:
+    def __init__(self, client, cache_path, credentials=None, ttl=600, endpoint='/login'):
+        self.client = client
+        self.cache_path = str(cache_path)
+        self.credentials = dict(credentials or DEFAULT_CREDENTIALS)
+        self.ttl = ttl
+        self.endpoint = endpoint
+        self.logins = 0
+        self._lock = threading.Lock()
+        self._token = None
+        self._expires_at = 0.0
+
+    @property
+    def cache_key(self):
+        return f'{self.client.base_url}{self.endpoint} {self.credentials.get("email")}'
+
+    def _read_cache(self):
+        try:
+            with open(self.cache_path) as cache:
+                return json.load(cache)
+        except (OSError, ValueError):
+            return {}
+
+    def _write_cache(self, entries):
+        now = time.time()
+        entries = {key: entry for key, entry in entries.items() if entry['expires_at'] > now}
+        temporary = f'{self.cache_path}.{os.getpid()}.tmp'
+        with open(temporary, 'w') as cache:
+            json.dump(entries, cache)
+        os.replace(temporary, self.cache_path)
+
+    def _acquire(self, stale_token=None):
+        with file_lock(f'{self.cache_path}.lock'):
+            entries = self._read_cache()
+            entry = entries.get(self.cache_key)
+            if entry and entry['expires_at'] > time.time() and entry['token'] != stale_token:
+                return entry['token'], entry['expires_at']
+
+            response = self.client.send('POST', self.endpoint, json=self.credentials)
+            self.logins += 1
+            if response.status_code != 200 or 'token' not in response.json():
+                raise RuntimeError(f'Could not obtain an auth token from {self.endpoint}: '
+                                   f'{response.status_code} {response.text}')
+            token, expires_at = response.json()['token'], time.time() + self.ttl
+            entries[self.cache_key] = {'token': token, 'expires_at': expires_at}
+            self._write_cache(entries)
+            return token, expires_at
+
+    def token(self):
+        with self._lock:
+            if self._token is None or self._expires_at <= time.time():
+                self._token, self._expires_at = self._acquire()
+            return self._token
+
+    def invalidate(self, token=None):
+        """Forget the token and fetch a new one, unless another caller already did."""
+        with self._lock:
+            if token is None or token == self._token:
+                self._token, self._expires_at = self._acquire(stale_token=self._token)
+
+    def headers(self):
+        return {'Authorization': f'Bearer {self.token()}'}
+
+    def request(self, method, path, **kwargs):
+        token = self.token()
+        headers = dict(kwargs.pop('headers', None) or {})
+        response = self.client.request(method, path, headers={**headers, 'Authorization': f'Bearer {token}'},
+                                       **kwargs)
+        if response.status_code == 401:
+            self.invalidate(token)
+            response = self.client.request(method, path, headers={**headers, **self.headers()}, **kwargs)
+        return response
+
+    def get(self, path, **kwargs):
+        return self.request('GET', path, **kwargs)
+
+    def post(self, path, **kwargs):
+        return self.request('POST', path, **kwargs)
+
+    def put(self, path, **kwargs):
+        return self.request('PUT', path, **kwargs)
+
+    def patch(self, path, **kwargs):
+        return self.request('PATCH', path, **kwargs)
+
+    def delete(self, path, **kwargs):
+        return self.request('DELETE', path, **kwargs)
@@ -0,0 +1,232 @@
+"""Throughput benchmark of the harness itself against the local stand-in.
+
+    python benchmark.py --requests 10000
+    python benchmark.py --modes pooled,threaded --threads 16 --compare benchmark-results/previous.json
+    python benchmark.py --requests 2000 test_3_crud.py
+
+The selected scenarios (default: the whole suite except ``long_latency``
+tests) are run in repeated iterations until about ``--requests`` requests have
+been sent, once per execution mode:
+
+* serial: one thread, a new connection for every request
+* pooled: one thread, one keep-alive session
+* threaded: ``--threads`` virtual users, each with its own pooled session
+* async: one thread; each iteration first fires the prefetch-marked requests
+  concurrently, as ``--async-mode`` does, then runs the scenarios
+
+Each mode runs in its own subprocess, so the memory high-water mark (max RSS)
+is per mode. The stand-in runs in this process. Results go to a JSON file
+(``--output``) that a later run can ``--compare`` against.
+"""
+import argparse
+import json
+import math
+import os
+import platform
+import subprocess
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+
+try:
+    import resource
+except ImportError:  # Windows: no max RSS
+    resource = None
+
+MODES = ('serial', 'pooled', 'threaded', 'async')
+DEFAULT_SELECTION = ['-m', 'not long_latency']
+
+
+def max_rss_kb():
+    if resource is None:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss // 1024 if sys.platform == 'darwin' else rss
+
+
+def run_mode(mode, base_url, target_requests, threads, concurrency, pytest_args):
+    """Runs in the worker subprocess; returns the result row of one mode."""
+    from async_runner import AsyncApiClient, EventLoopThread, prefetch, prefetch_specs
+    from chains import ChainState
+    from load_runner import LoadStats, VirtualUser, check_fixtures, collect
+    from timing import percentile
+
+    class BenchUser(VirtualUser):
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, **kwargs)
+            if mode == 'serial':
+                self.client.session.headers['Connection'] = 'close'
+            self.client.session.hooks['response'].append(self.on_response)
+            self.http_seconds = 0.0
+            self.tests = []
+
+        def on_response(self, response, *args, **kwargs):
+            if threading.current_thread() is self:
+                self.http_seconds += response.elapsed.total_seconds()
+
+        def run(self):
+            if mode != 'async':
+                return super().run()
+            async_client = AsyncApiClient(self.client, concurrency=concurrency)
+            loop_thread = EventLoopThread().start()
+            try:
+                for _ in range(self.iterations):
+                    prefetch(async_client, loop_thread, prefetch_specs(self.items))
+                    chain = ChainState(self.name)
+                    for item in self.items:
+                        self.run_item(item, chain)
+                    self.client.prefetched.clear()
+            finally:
+                loop_thread.stop()
+                async_client.close()
+                self.client.close()
+
+        def run_item(self, item, chain):
+            http_before, started = self.http_seconds, time.perf_counter()
+            self.client.owner = item.nodeid
+            super().run_item(item, chain)
+            self.tests.append((time.perf_counter() - started, self.http_seconds - http_before))
+
+    items = collect(pytest_args)
+    check_fixtures(items)
+    warmup = LoadStats()
+    user = BenchUser(0, items, base_url, warmup, float('inf'), 1, 0)
+    user.run()
+    per_iteration = sum(len(values) for values in warmup.latencies.values()) or 1
+    users = threads if mode == 'threaded' else 1
+    iterations = max(math.ceil(target_requests / per_iteration / users), 1)
+    rss_before = max_rss_kb()
+
+    stats = LoadStats()
+    workers = [BenchUser(number, items, base_url, stats, float('inf'), iterations, 0) for number in range(users)]
+    stats.started = time.monotonic()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    stats.finished = time.monotonic()
+
+    summary = stats.summary()
+    latencies = sorted(value for values in stats.latencies.values() for value in values)
+    tests = [test for worker in workers for test in worker.tests]
+    requests_sent = sum(row['requests'] for row in summary['endpoints'].values())
+    return {
+        'mode': mode,
+        'users': users,
+        'iterations': iterations,
+        'requests': requests_sent,
+        'tests': len(tests),
+        'wall_seconds': summary['wall_seconds'],
+        'requests_per_second': round(requests_sent / summary['wall_seconds'], 1),
+        'tests_per_second': round(len(tests) / summary['wall_seconds'], 1),
+        'per_test_ms': round(sum(wall for wall, _ in tests) / len(tests) * 1000, 3) if tests else 0.0,
+        'per_test_overhead_ms': round(sum(wall - http for wall, http in tests) / len(tests) * 1000, 3)
+        if tests else 0.0,
+        'p50_ms': round(percentile(latencies, 0.50) * 1000, 3),
+        'p95_ms': round(percentile(latencies, 0.95) * 1000, 3),
+        'errors': sum(row['errors'] for row in summary['endpoints'].values()),
+        'failed': sum(outcome['failed'] for outcome in summary['scenarios'].values()),
+        'max_rss_kb_before': rss_before,
+        'max_rss_kb': max_rss_kb(),
+    }
+
+
+def spawn(mode, base_url, options, pytest_args):
+    command = [sys.executable, os.path.abspath(__file__), '--worker', mode, '--base-url', base_url,
+               '--requests', str(options.requests), '--threads', str(options.threads),
+               '--concurrency', str(options.concurrency), *pytest_args]
+    completed = subprocess.run(command, capture_output=True, text=True, cwd=os.path.dirname(os.path.abspath(__file__)))
+    if completed.returncode != 0:
+        raise SystemExit(f'benchmark mode {mode} failed:\n{completed.stderr}')
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def format_report(results, previous=None):
+    baseline = {row['mode']: row for row in (previous or {}).get('results', [])}
+    lines = [f'{"mode":<10}{"requests":>10}{"req/s":>10}{"tests/s":>10}{"test ms":>10}{"overhead":>10}'
+             f'{"p50 ms":>9}{"p95 ms":>9}{"max rss MB":>12}' + (f'{"req/s vs prev":>15}' if baseline else '')]
+    for row in results:
+        rss = f'{row["max_rss_kb"] / 1024:.1f}' if row['max_rss_kb'] is not None else '-'
+        line = (f'{row["mode"]:<10}{row["requests"]:>10}{row["requests_per_second"]:>10.1f}'
+                f'{row["tests_per_second"]:>10.1f}{row["per_test_ms"]:>10.3f}{row["per_test_overhead_ms"]:>10.3f}'
+                f'{row["p50_ms"]:>9.3f}{row["p95_ms"]:>9.3f}{rss:>12}')
+        if row['mode'] in baseline:
+            before = baseline[row['mode']]['requests_per_second']
+            line += f'{(row["requests_per_second"] - before) / before * 100:>+14.1f}%'
+        lines.append(line)
+    lines.append('(overhead = time per test outside its own requests)')
+    return '\n'.join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark the harness against the local stand-in.')
+    parser.add_argument('--requests', type=int, default=10000, help='Approximate requests per mode')
+    parser.add_argument('--modes', default=','.join(MODES), help=f'Comma separated subset of {", ".join(MODES)}')
+    parser.add_argument('--threads', type=int, default=8, help='Virtual users in threaded mode')
+    parser.add_argument('--concurrency', type=int, default=8, help='Requests in flight in async mode')
+    parser.add_argument('--stub-latency', action='append', default=[], metavar='ROUTE=SECONDS')
+    parser.add_argument('--output', help='JSON results file (default: benchmark-results/benchmark-<time>.json)')
+    parser.add_argument('--compare', help='Earlier results file to compare requests/sec against')
+    parser.add_argument('--worker', choices=MODES, help=argparse.SUPPRESS)
+    parser.add_argument('--base-url', help=argparse.SUPPRESS)
+    options, pytest_args = parser.parse_known_args(argv)
+    pytest_args = pytest_args or DEFAULT_SELECTION
+
+    if options.worker:
+        row = run_mode(options.worker, options.base_url, options.requests, options.threads, options.concurrency,
+                       pytest_args)
+        print(json.dumps(row))
+        return 0
+
+    from stub_server import StubServer, parse_latency
+
+    modes = [mode.strip() for mode in options.modes.split(',') if mode.strip()]
+    unknown = set(modes) - set(MODES)
+    if unknown:
+        parser.error(f'unknown mode(s): {", ".join(sorted(unknown))}')
+
+    server = StubServer(latency=parse_latency(options.stub_latency)).start()
+    try:
+        results = [spawn(mode, server.base_url, options, pytest_args) for mode in modes]
+    finally:
+        server.stop()
+
+    started = datetime.now(timezone.utc)
+    report = {
+        'created': started.isoformat(timespec='seconds'),
+        'commit': git_commit(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpus': os.cpu_count(),
+        'requests_target': options.requests,
+        'threads': options.threads,
+        'concurrency': options.concurrency,
+        'stub_latency': options.stub_latency,
+        'pytest_args': pytest_args,
+        'results': results,
+    }
+    output = options.output or os.path.join('benchmark-results', f'benchmark-{started:%Y%m%d-%H%M%S}.json')
+    os.makedirs(os.path.dirname(output) or '.', exist_ok=True)
+    with open(output, 'w') as handle:
+        json.dump(report, handle, indent=2)
+
+    previous = None
+    if options.compare:
+        with open(options.compare) as handle:
+            previous = json.load(handle)
+    print(format_report(results, previous))
+    print(f'results written to {output}')
+    return 1 if any(row['errors'] or row['failed'] for row in results) else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,89 @@
+"""Data-driven cases streamed from JSONL files.
+
+    @pytest.mark.cases('cases/login.jsonl')
+    def test_login_cases(self, api_client, case): ...
+
+Each line of the file is one case, a JSON object. At collection time the file
+is only scanned for line offsets, never parsed, so a corpus of many thousands
+of cases costs one pass over the bytes and an int per case. The ``case``
+fixture reads and decodes its own line when the test runs.
+
+Case ids are stable: a line starting with ``{"id": "..."`` uses that id,
+any other line is named after the sha1 of its bytes, so ids survive reordering
+and appending. ``--cases-limit N`` keeps the first N cases of every file.
+
+PYTEST_DONT_REWRITE
+"""
+import hashlib
+import json
+import mmap
+import os
+import re
+import threading
+
+import pytest
+
+ID_RE = re.compile(rb'^\{\s*"id"\s*:\s*"((?:[^"\\]|\\.)*)"')
+
+_handles = {}
+_handles_lock = threading.Lock()
+
+
+def scan_cases(path, limit=None):
+    """Yield (case_id, offset) for every non-blank line of a JSONL file."""
+    if not os.path.getsize(path):
+        return
+    with open(path, 'rb') as source, mmap.mmap(source.fileno(), 0, access=mmap.ACCESS_READ) as data:
+        offset, count, size = 0, 0, len(data)
+        while offset < size and (limit is None or count < limit):
+            end = data.find(b'\n', offset)
+            end = size if end == -1 else end
+            line = data[offset:end].strip()
+            if line:
+                match = ID_RE.match(line)
+                yield (match.group(1).decode() if match else hashlib.sha1(line).hexdigest()[:12]), offset
+                count += 1
+            offset = end + 1
+
+
+def read_case(param):
+    """Decode the case a ``(path, offset)`` parameter points at."""
+    path, offset = param
+    with _handles_lock:
+        handle = _handles.get(path)
+        if handle is None:
+            handle = _handles[path] = open(path, 'rb')
+        handle.seek(offset)
+        line = handle.readline()
+    return json.loads(line)
+
+
+def pytest_addoption(parser):
+    parser.addoption('--cases-limit', action='store', type=int, default=None,
+                     help='Only generate the first N cases of every JSONL case file')
+
+
+def pytest_configure(config):
+    config.addinivalue_line('markers', 'cases(path): parametrize the "case" fixture from a JSONL case file')
+
+
+def pytest_generate_tests(metafunc):
+    marker = metafunc.definition.get_closest_marker('cases')
+    if marker is None or 'case' not in metafunc.fixturenames:
+        return
+    path = os.path.join(str(metafunc.config.rootpath), marker.args[0])
+    params, ids = [], []
+    for case_id, offset in scan_cases(path, metafunc.config.getoption('--cases-limit')):
+        params.append((path, offset))
+        ids.append(case_id)
+    metafunc.parametrize('case', params, ids=ids, indirect=True)
+
+
+@pytest.fixture
+def case(request):
+    return read_case(request.param)
+
+
+def pytest_unconfigure(config):
+    while _handles:
+        _handles.popitem()[1].close()
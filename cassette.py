@@ -0,0 +1,163 @@
+import hashlib
+import json
+import mmap
+import os
+import threading
+import time
+import uuid
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import BaseAdapter, HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+
+from locks import file_lock
+
+# Every cassette line starts with '{"key": "<40 hex chars>", "run": "<32 hex chars>"',
+# so the replay index can be built by slicing raw lines without decoding any JSON.
+KEY_PREFIX = b'{"key": "'
+KEY_SLICE = slice(len(KEY_PREFIX), len(KEY_PREFIX) + 40)
+RUN_PREFIX = b'", "run": "'
+RUN_SLICE = slice(KEY_SLICE.stop + len(RUN_PREFIX), KEY_SLICE.stop + len(RUN_PREFIX) + 32)
+
+
+def cassette_key(method, url, body=None):
+    """Hash of (method, path?query, body); the host is left out so a cassette
+    recorded against one base URL replays against any other."""
+    parts = urlsplit(url)
+    target = parts.path + (f'?{parts.query}' if parts.query else '')
+    if isinstance(body, str):
+        body = body.encode()
+    digest = hashlib.sha1(f'{method.upper()} {target}\n'.encode())
+    digest.update(body or b'')
+    return digest.hexdigest()
+
+
+class RecordingAdapter(BaseAdapter):
+    """Sends through the wrapped adapter and appends every exchange to a JSONL cassette.
+
+    Entries are tagged with ``run_id`` (pass the same one from every xdist
+    worker of a run) and replay only serves a key from the newest run that
+    recorded it, so re-recording supersedes older responses. Appends are
+    serialized with a file lock, so workers can share one cassette.
+    """
+
+    def __init__(self, path, inner=None, run_id=None):
+        super().__init__()
+        self.inner = inner or HTTPAdapter()
+        self.path = path
+        # fixed width so replay can slice it; any id (e.g. xdist's --testrunuid) is hashed to 32 hex chars
+        self.run_id = hashlib.sha1(str(run_id).encode()).hexdigest()[:32] if run_id else uuid.uuid4().hex
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+
+    def send(self, request, **kwargs):
+        started = time.perf_counter()
+        response = self.inner.send(request, **kwargs)
+        elapsed = time.perf_counter() - started
+        body = request.body.decode() if isinstance(request.body, bytes) else request.body
+        entry = {
+            'key': cassette_key(request.method, request.url, request.body),
+            'run': self.run_id,
+            'method': request.method,
+            'url': request.url,
+            'request_body': body,
+            'status': response.status_code,
+            'reason': response.reason,
+            'headers': {name: value for name, value in response.headers.items()
+                        if name.lower() not in ('content-encoding', 'transfer-encoding')},
+            'body': response.text,
+            'elapsed': round(elapsed, 6),
+        }
+        line = (json.dumps(entry, ensure_ascii=False) + '\n').encode()
+        with self._lock, file_lock(f'{self.path}.lock'):
+            os.write(self._fd, line)
+        return response
+
+    def close(self):
+        self.inner.close()
+        with self._lock:
+            # mounted for both http:// and https://, so the session closes it twice
+            if self._fd is not None:
+                os.close(self._fd)
+                self._fd = None
+
+
+class ReplayAdapter(BaseAdapter):
+    """Serves responses from a recorded cassette.
+
+    The file is memory-mapped and indexed by key -> line offsets; a line is
+    only decoded when its response is actually requested. Only the entries of
+    the newest run that recorded a key are served. Repeated requests with that
+    key replay them in order, the last one sticking once they run out.
+    Entries without a run id count as older than any run. With replay_latency the recorded elapsed time
+    is slept before answering, for checks that assert on timing.
+    """
+
+    def __init__(self, path, replay_latency=False):
+        super().__init__()
+        self.path = path
+        self.replay_latency = replay_latency
+        self._lock = threading.Lock()
+        self._file = open(path, 'rb')
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if os.path.getsize(path) else b''
+        self._index = self._build_index()
+        self._served = {}
+
+    def _build_index(self):
+        index, runs = {}, {}
+        offset, size = 0, len(self._map)
+        while offset < size:
+            end = self._map.find(b'\n', offset)
+            end = size if end == -1 else end
+            if self._map[offset:offset + len(KEY_PREFIX)] == KEY_PREFIX:
+                key = self._map[offset + KEY_SLICE.start:offset + KEY_SLICE.stop].decode()
+                run = -1
+                if self._map[offset + KEY_SLICE.stop:offset + RUN_SLICE.start] == RUN_PREFIX:
+                    run = runs.setdefault(self._map[offset + RUN_SLICE.start:offset + RUN_SLICE.stop], len(runs))
+                newest, offsets = index.get(key, (run, []))
+                if run > newest:
+                    newest, offsets = run, []
+                if run == newest:
+                    offsets.append((offset, end))
+                index[key] = (newest, offsets)
+            offset = end + 1
+        return {key: offsets for key, (_, offsets) in index.items()}
+
+    def __len__(self):
+        return sum(len(offsets) for offsets in self._index.values())
+
+    def lookup(self, method, url, body=None):
+        key = cassette_key(method, url, body)
+        offsets = self._index.get(key)
+        if not offsets:
+            return None
+        with self._lock:
+            position = self._served.get(key, 0)
+            self._served[key] = position + 1
+        start, end = offsets[min(position, len(offsets) - 1)]
+        return json.loads(self._map[start:end])
+
+    def send(self, request, **kwargs):
+        entry = self.lookup(request.method, request.url, request.body)
+        if entry is None:
+            raise requests.ConnectionError(
+                f'No recorded response for {request.method} {request.url} in cassette {self.path}', request=request)
+        if self.replay_latency:
+            time.sleep(entry.get('elapsed', 0))
+
+        response = requests.Response()
+        response.status_code = entry['status']
+        response.reason = entry.get('reason')
+        response.headers = CaseInsensitiveDict(entry['headers'])
+        response._content = entry['body'].encode()
+        response.encoding = 'utf-8'
+        response.url = request.url
+        response.request = request
+        return response
+
+    def close(self):
+        if isinstance(self._map, mmap.mmap):
+            self._map.close()
+        self._file.close()
@@ -0,0 +1,163 @@
+"""Producer/consumer ordering between tests.
+
+A producer test is marked ``@pytest.mark.produces('user_id')`` and hands the
+value over with ``chain.publish('user_id', value)``. A consumer just requests a
+fixture of the same name, created in conftest with ``produced('user_id')``.
+At collection time the edges form a DAG: items are topologically ordered and
+every connected chain gets its own ``xdist_group`` so ``-n auto --dist loadgroup``
+keeps a chain on one worker while independent chains run in parallel. Plain
+``-n`` (xdist's default ``--dist load``) is switched to ``loadgroup`` for that.
+
+PYTEST_DONT_REWRITE
+"""
+import heapq
+
+import pytest
+
+PRODUCED_KEYS = set()
+
+chain_registry_key = pytest.StashKey()
+chain_of_item_key = pytest.StashKey()
+producer_of_key = pytest.StashKey()
+
+
+class ChainState:
+    """Values published inside one chain; other chains never see them."""
+
+    def __init__(self, name):
+        self.name = name
+        self.values = {}
+
+    def publish(self, key, value):
+        self.values[key] = value
+
+    def get(self, key, reason='its producer failed or was not selected'):
+        if key not in self.values:
+            pytest.skip(f'"{key}" was not produced in chain "{self.name}": {reason}')
+        return self.values[key]
+
+
+def produced(key):
+    """Build the consumer fixture for ``key``, published by a ``produces`` test."""
+    PRODUCED_KEYS.add(key)
+
+    @pytest.fixture(name=key)
+    def _fixture(request, chain):
+        if key in chain.values:
+            return chain.values[key]
+        producer, nodeid = request.config.stash[producer_of_key].get(key, (None, None))
+        if producer is None:
+            reason = 'no collected test produces it'
+        elif not any(item is producer for item in request.session.items):
+            reason = f'its producer {nodeid} is not part of this run'
+        else:
+            reason = f'its producer {nodeid} failed or was skipped'
+        return chain.get(key, reason)
+
+    return _fixture
+
+
+def pytest_configure(config):
+    config.addinivalue_line('markers', 'produces(*keys): the test publishes these values for later tests')
+    config.addinivalue_line('markers', 'xdist_group(name): run all tests of the group on the same xdist worker')
+    config.stash[chain_registry_key] = {}
+    config.stash[producer_of_key] = {}
+    # xdist's default scheduler ignores xdist_group and would split chains over workers
+    if getattr(config.option, 'dist', 'no') == 'load' and getattr(config.option, 'numprocesses', None):
+        config.option.dist = 'loadgroup'
+    # workers derive their own setting from the command line, see pytest_configure_node
+    if getattr(config, 'workerinput', {}).get('chains_loadgroup'):
+        config.option.loadgroup = True
+
+
+@pytest.hookimpl(optionalhook=True)
+def pytest_configure_node(node):
+    node.workerinput['chains_loadgroup'] = node.config.option.dist == 'loadgroup'
+
+
+@pytest.fixture
+def chain(request):
+    registry = request.config.stash[chain_registry_key]
+    name = request.node.stash.get(chain_of_item_key, request.node.nodeid)
+    if name not in registry:
+        registry[name] = ChainState(name)
+    return registry[name]
+
+
+def _producers(items):
+    producers = {}
+    for index, item in enumerate(items):
+        for marker in item.iter_markers('produces'):
+            for key in marker.args:
+                if key in producers:
+                    raise pytest.UsageError(
+                        f'"{key}" is produced by both {items[producers[key]].nodeid} and {item.nodeid}')
+                producers[key] = index
+    return producers
+
+
+def build_graph(items):
+    """Return (edges, chain roots) of the dependency DAG over ``items``, by index."""
+    producers = _producers(items)
+    edges = {index: set() for index in range(len(items))}
+    for index, item in enumerate(items):
+        for name in getattr(item, 'fixturenames', ()):
+            if name in PRODUCED_KEYS and name in producers and producers[name] != index:
+                edges[producers[name]].add(index)
+
+    parent = list(range(len(items)))
+
+    def find(node):
+        while parent[node] != node:
+            parent[node] = parent[parent[node]]
+            node = parent[node]
+        return node
+
+    for source, targets in edges.items():
+        for target in targets:
+            parent[find(target)] = find(source)
+    return edges, [find(index) for index in range(len(items))]
+
+
+def topological_order(items, edges):
+    """Kahn's algorithm, breaking ties by collection order."""
+    indegree = [0] * len(items)
+    for targets in edges.values():
+        for target in targets:
+            indegree[target] += 1
+    ready = [index for index, degree in enumerate(indegree) if degree == 0]
+    heapq.heapify(ready)
+    order = []
+    while ready:
+        index = heapq.heappop(ready)
+        order.append(index)
+        for target in edges[index]:
+            indegree[target] -= 1
+            if indegree[target] == 0:
+                heapq.heappush(ready, target)
+    if len(order) != len(items):
+        cyclic = [items[index].nodeid for index, degree in enumerate(indegree) if degree]
+        raise pytest.UsageError(f'Dependency cycle between tests: {", ".join(cyclic)}')
+    return order
+
+
+@pytest.hookimpl(tryfirst=True)
+def pytest_collection_modifyitems(config, items):
+    # items, not nodeids: xdist's loadgroup appends "@group" to the nodeids after this hook
+    config.stash[producer_of_key] = {key: (items[index], items[index].nodeid)
+                                     for key, index in _producers(items).items()}
+    edges, roots = build_graph(items)
+    order = topological_order(items, edges)
+
+    members = {}
+    for index, root in enumerate(roots):
+        members.setdefault(root, []).append(index)
+    for indexes in members.values():
+        if len(indexes) < 2:
+            continue
+        name = items[min(indexes)].nodeid
+        for index in indexes:
+            items[index].stash[chain_of_item_key] = name
+            items[index].add_marker(pytest.mark.xdist_group(name=name))
+
+    items[:] = [items[index] for index in order]
@@ -0,0 +1,167 @@
+"""Fail-fast health gate and per-host circuit breaker for the shared client.
+
+Before the first test the client probes the target once with a short timeout.
+Afterwards every request passes through a breaker keyed by host. Connection
+errors, timeouts, 429s and 5xx responses count as failures; requests time out
+after ``--request-timeout`` seconds, so a target that accepts connections and
+then hangs trips the breaker too. After
+``--breaker-threshold`` consecutive failures, or a failed probe, the circuit
+opens and requests to that host raise ``CircuitOpenError`` at once instead of
+waiting out their own timeouts. Allure reports those tests as broken, under
+"To Investigate". Once the backoff has passed, a single trial request is let
+through (half-open). Success closes the circuit; failure reopens it and
+doubles the backoff, up to ``--breaker-max-backoff``.
+
+PYTEST_DONT_REWRITE
+"""
+import threading
+import time
+from urllib.parse import urlsplit
+
+import pytest
+import requests
+from requests.adapters import BaseAdapter
+
+CLOSED, OPEN, HALF_OPEN = 'closed', 'open', 'half-open'
+
+circuit_breaker_key = pytest.StashKey()
+
+
+class CircuitOpenError(requests.ConnectionError):
+    pass
+
+
+class HostCircuit:
+    def __init__(self, backoff):
+        self.state = CLOSED
+        self.failures = 0
+        self.backoff = backoff
+        self.opened_at = 0.0
+        self.last_failure = None
+        self.trips = 0
+        self.short_circuited = 0
+
+
+class CircuitBreakerAdapter(BaseAdapter):
+    def __init__(self, inner, threshold=3, backoff=1.0, max_backoff=30.0, trial_timeout=5.0):
+        super().__init__()
+        self.inner = inner
+        self.threshold = threshold
+        self.initial_backoff = backoff
+        self.max_backoff = max_backoff
+        self.trial_timeout = trial_timeout
+        self.circuits = {}
+        self._lock = threading.Lock()
+
+    def circuit(self, host):
+        circuit = self.circuits.get(host)
+        if circuit is None:
+            circuit = self.circuits[host] = HostCircuit(self.initial_backoff)
+        return circuit
+
+    def trip(self, host, reason):
+        with self._lock:
+            self._open(self.circuit(host), reason)
+
+    def _open(self, circuit, reason):
+        if circuit.state == HALF_OPEN:
+            circuit.backoff = min(circuit.backoff * 2, self.max_backoff)
+        circuit.state = OPEN
+        circuit.opened_at = time.monotonic()
+        circuit.last_failure = reason
+        circuit.trips += 1
+
+    def _admit(self, host):
+        """Returns True for a half-open trial, False for a normal request; raises while open."""
+        with self._lock:
+            circuit = self.circuit(host)
+            if circuit.state == CLOSED:
+                return False
+            if circuit.state == OPEN and time.monotonic() - circuit.opened_at >= circuit.backoff:
+                circuit.state = HALF_OPEN
+                return True
+            circuit.short_circuited += 1
+            raise CircuitOpenError(
+                f'Circuit open for {host} (last failure: {circuit.last_failure}); '
+                f'the target API needs to be investigated')
+
+    def _record(self, host, failure):
+        with self._lock:
+            circuit = self.circuit(host)
+            if failure is None:
+                circuit.state = CLOSED
+                circuit.failures = 0
+                circuit.backoff = self.initial_backoff
+                return
+            circuit.failures += 1
+            circuit.last_failure = failure
+            if circuit.state == HALF_OPEN or circuit.failures >= self.threshold:
+                self._open(circuit, failure)
+
+    def send(self, request, **kwargs):
+        host = urlsplit(request.url).netloc
+        trial = self._admit(host)
+        timeout = kwargs.get('timeout')
+        if trial and (timeout is None or isinstance(timeout, (int, float)) and timeout > self.trial_timeout):
+            kwargs['timeout'] = self.trial_timeout
+        try:
+            response = self.inner.send(request, **kwargs)
+        except (requests.ConnectionError, requests.Timeout) as error:
+            self._record(host, type(error).__name__)
+            if trial:
+                raise CircuitOpenError(f'Half-open trial to {host} failed ({type(error).__name__}); '
+                                       f'the target API needs to be investigated') from error
+            raise
+        self._record(host, f'HTTP {response.status_code}' if response.status_code == 429
+                     or response.status_code >= 500 else None)
+        return response
+
+    def close(self):
+        self.inner.close()
+
+
+def pytest_addoption(parser):
+    parser.addoption('--breaker-threshold', action='store', type=int, default=3,
+                     help='Consecutive connection/5xx failures that open the circuit for a host, 0 disables')
+    parser.addoption('--breaker-backoff', action='store', type=float, default=1.0,
+                     help='Seconds an open circuit waits before a half-open trial request')
+    parser.addoption('--breaker-max-backoff', action='store', type=float, default=30.0)
+    parser.addoption('--health-probe', action='store', default='/users?page=1',
+                     help='Path probed once before the run, empty to skip')
+    parser.addoption('--health-timeout', action='store', type=float, default=5.0,
+                     help='Timeout of the health probe and of half-open trial requests')
+
+
+def install(config, client):
+    """Mount the breaker on client and run the health probe; returns the adapter or None."""
+    threshold = config.getoption('--breaker-threshold')
+    if threshold <= 0:
+        return None
+    timeout = config.getoption('--health-timeout')
+    breaker = CircuitBreakerAdapter(client.adapter, threshold=threshold,
+                                    backoff=config.getoption('--breaker-backoff'),
+                                    max_backoff=config.getoption('--breaker-max-backoff'), trial_timeout=timeout)
+    client.mount(breaker)
+    config.stash[circuit_breaker_key] = breaker
+
+    probe = config.getoption('--health-probe')
+    if probe:
+        try:
+            response = client.send('GET', probe, timeout=timeout)
+        except requests.RequestException as error:
+            breaker.trip(urlsplit(client.base_url).netloc, f'health probe: {type(error).__name__}')
+        else:
+            if response.status_code == 429 or response.status_code >= 500:
+                breaker.trip(urlsplit(client.base_url).netloc, f'health probe: HTTP {response.status_code}')
+    return breaker
+
+
+def pytest_terminal_summary(terminalreporter, config):
+    breaker = config.stash.get(circuit_breaker_key, None)
+    if breaker is None or not any(circuit.trips for circuit in breaker.circuits.values()):
+        return
+    terminalreporter.section('circuit breaker')
+    for host, circuit in breaker.circuits.items():
+        terminalreporter.write_line(f'{host}: {circuit.state}, tripped {circuit.trips}x, '
+                                    f'{circuit.short_circuited} requests short-circuited, '
+                                    f'last failure: {circuit.last_failure}')
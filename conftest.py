@@ -0,0 +1,93 @@
+import pytest
+from api_client import ApiClient
+from auth import AuthProvider
+from cassette import RecordingAdapter, ReplayAdapter
+from chains import produced
+from circuit_breaker import install as install_circuit_breaker
+from http_cache import install as install_http_cache
+from stub_server import StubServer, parse_latency
+
+pytest_plugins = ['chains', 'async_runner', 'timing', 'attachments', 'sharding', 'http_cache', 'cases', 'circuit_breaker', 'overhead']
+
+user_id = produced('user_id')
+resource_id = produced('resource_id')
+created_user_id = produced('created_user_id')
+token = produced('token')
+
+
+def pytest_addoption(parser):
+    parser.addoption('--base-url', action='store', default=ApiClient.base_url,
+                     help='Base URL of the API under test')
+    parser.addoption('--pool-size', action='store', type=int, default=ApiClient.pool_maxsize,
+                     help='Max pooled keep-alive connections per host')
+    parser.addoption('--request-timeout', action='store', type=float, default=ApiClient.timeout,
+                     help='Seconds a request may wait for the API before it fails with Timeout')
+    parser.addoption('--api-target', action='store', choices=('live', 'local'), default='live',
+                     help='Run against the live API or the bundled in-process stand-in')
+    parser.addoption('--stub-latency', action='append', default=[], metavar='ROUTE=SECONDS',
+                     help='Extra latency injected by the local stand-in for a route prefix, may be repeated')
+    parser.addoption('--record-mode', action='store', choices=('off', 'record', 'replay'), default='off',
+                     help='Record HTTP traffic into the cassette or replay it instead of hitting the network')
+    parser.addoption('--cassette', action='store', default='cassettes/reqres.jsonl',
+                     help='JSONL cassette used by --record-mode')
+    parser.addoption('--auth-ttl', action='store', type=float, default=600,
+                     help='Seconds a cached auth token is reused before logging in again')
+    parser.addoption('--replay-latency', action='store_true', default=False,
+                     help='In replay mode, wait out the recorded response time of each exchange')
+
+
+def pytest_collection_modifyitems(config, items):
+    if config.getoption('--api-target') == 'local' and config.getoption('--record-mode') != 'replay':
+        return
+    skip = pytest.mark.skip(reason='needs a route only the local stand-in serves (--api-target=local)')
+    for item in items:
+        if item.get_closest_marker('stand_in') is not None:
+            item.add_marker(skip)
+
+
+@pytest.fixture(scope='session')
+def stub_server(request):
+    server = StubServer(latency=parse_latency(request.config.getoption('--stub-latency'))).start()
+    yield server
+    server.stop()
+
+
+@pytest.fixture(scope='session')
+def base_url(request):
+    if request.config.getoption('--record-mode') == 'replay':
+        return request.config.getoption('--base-url')
+    if request.config.getoption('--api-target') == 'local':
+        return request.getfixturevalue('stub_server').base_url
+    return request.config.getoption('--base-url')
+
+
+@pytest.fixture(scope='session')
+def api_client(request, base_url, latency_recorder):
+    client = ApiClient(
+        base_url=base_url,
+        pool_maxsize=request.config.getoption('--pool-size'),
+        timeout=request.config.getoption('--request-timeout'),
+    )
+    record_mode = request.config.getoption('--record-mode')
+    if record_mode == 'record':
+        # all xdist workers of a run share the controller's run id, so replay sees them as one recording
+        run_id = getattr(request.config, 'workerinput', {}).get('testrunuid')
+        client.mount(RecordingAdapter(request.config.getoption('--cassette'), inner=client.adapter, run_id=run_id))
+    elif record_mode == 'replay':
+        client.mount(ReplayAdapter(request.config.getoption('--cassette'),
+                                  replay_latency=request.config.getoption('--replay-latency')))
+    if record_mode != 'replay':
+        install_circuit_breaker(request.config, client)
+    install_http_cache(request.config, client)
+    client.response_hooks.append(latency_recorder.on_response)
+    yield client
+    client.close()
+
+
+@pytest.fixture(scope='session')
+def auth(request, api_client, tmp_path_factory):
+    # xdist workers get basetemp/popen-gwN, so the controller's basetemp is their parent; a plain
+    # run keeps the token in its own basetemp, never shared with other runs
+    basetemp = tmp_path_factory.getbasetemp()
+    cache_path = (basetemp.parent if hasattr(request.config, 'workerinput') else basetemp) / 'auth_token.json'
+    return AuthProvider(api_client, cache_path, ttl=request.config.getoption('--auth-ttl'))
@@ -0,0 +1,250 @@
+"""Opt-in cache for idempotent GETs, mounted in front of the client's adapter.
+
+Only 200 responses to GET are stored, in an LRU bounded by entry count and
+total body size. Entries younger than the TTL are served without touching the
+network. Stale entries that carry an ETag are revalidated with
+If-None-Match, and a 304 refreshes them. Writes (POST/PUT/PATCH/DELETE) drop
+the cached entries under the written path. Requests matching a bypass rule,
+or carrying ``Cache-Control: no-cache``, always go to the wire; tests marked
+``no_cache`` send that header with their own and their prefetched requests.
+Entries are keyed by URL and Authorization header, and a response's ``Vary``
+headers must match too, so authenticated and anonymous GETs never share an
+entry.
+
+PYTEST_DONT_REWRITE
+"""
+import re
+import threading
+import time
+from collections import OrderedDict
+from urllib.parse import urlsplit
+
+import pytest
+import requests
+from requests.adapters import BaseAdapter
+from requests.structures import CaseInsensitiveDict
+
+DEFAULT_BYPASS = (r'[?&]delay=',)
+
+NO_CACHE_HEADERS = {'Cache-Control': 'no-cache'}
+
+http_cache_key = pytest.StashKey()
+cached_client_key = pytest.StashKey()
+worker_stats_key = pytest.StashKey()
+
+
+class CacheEntry:
+    __slots__ = ('status', 'reason', 'headers', 'content', 'encoding', 'etag', 'stored_at', 'vary')
+
+    def __init__(self, response, request):
+        self.status = response.status_code
+        self.reason = response.reason
+        self.headers = dict(response.headers)
+        self.content = response.content
+        self.encoding = response.encoding
+        self.etag = response.headers.get('ETag')
+        self.stored_at = time.monotonic()
+        self.vary = {name: request.headers.get(name) for name in vary_names(response)}
+
+    def matches(self, request):
+        return all(request.headers.get(name) == value for name, value in self.vary.items())
+
+    def build(self, request, response_class=requests.Response):
+        response = response_class()
+        response.status_code = self.status
+        response.reason = self.reason
+        response.headers = CaseInsensitiveDict(self.headers)
+        response._content = self.content
+        response.encoding = self.encoding
+        response.url = request.url
+        response.request = request
+        response.from_cache = True
+        return response
+
+
+def vary_names(response):
+    return [name.strip() for name in response.headers.get('Vary', '').split(',') if name.strip()]
+
+
+def cache_key(request):
+    return request.url, request.headers.get('Authorization')
+
+
+class CachingAdapter(BaseAdapter):
+    def __init__(self, inner, ttl=60.0, max_entries=256, max_bytes=8 * 1024 * 1024, bypass=DEFAULT_BYPASS):
+        super().__init__()
+        self.inner = inner
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.bypass_rules = tuple(re.compile(rule) for rule in bypass)
+        self.stats = dict.fromkeys(('hits', 'misses', 'revalidated', 'bypassed', 'evictions', 'invalidations'), 0)
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def _bypassed(self, request):
+        return request.headers.get('Cache-Control') == 'no-cache' or any(
+            rule.search(request.url) for rule in self.bypass_rules)
+
+    def _store(self, key, request, response):
+        entry = CacheEntry(response, request)
+        with self._lock:
+            self._drop(key)
+            self._entries[key] = entry
+            self._bytes += len(entry.content)
+            while self._entries and (len(self._entries) > self.max_entries or self._bytes > self.max_bytes):
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= len(evicted.content)
+                self.stats['evictions'] += 1
+
+    def _drop(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._bytes -= len(entry.content)
+
+    def invalidate(self, url):
+        """Drop cached GETs of url's path and everything below it."""
+        path = urlsplit(url).path.rstrip('/')
+        with self._lock:
+            for cached in [cached for cached in self._entries if urlsplit(cached[0]).path.startswith(path)]:
+                self._drop(cached)
+                self.stats['invalidations'] += 1
+
+    def send(self, request, **kwargs):
+        if request.method != 'GET':
+            if request.method != 'HEAD':
+                self.invalidate(request.url)
+            return self.inner.send(request, **kwargs)
+        if self._bypassed(request):
+            self.stats['bypassed'] += 1
+            return self.inner.send(request, **kwargs)
+
+        key = cache_key(request)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and not entry.matches(request):
+                entry = None
+            if entry is not None:
+                self._entries.move_to_end(key)
+        if entry is not None and time.monotonic() - entry.stored_at < self.ttl:
+            self.stats['hits'] += 1
+            return entry.build(request)
+
+        if entry is not None and entry.etag:
+            request.headers['If-None-Match'] = entry.etag
+        response = self.inner.send(request, **kwargs)
+        if entry is not None and entry.etag and response.status_code == 304:
+            self.stats['revalidated'] += 1
+            entry.stored_at = time.monotonic()
+            revalidated = entry.build(request, response_class=type(response))
+            revalidated.timings = getattr(response, 'timings', None)
+            return revalidated
+
+        self.stats['misses'] += 1
+        if response.status_code == 200 and '*' not in vary_names(response):
+            self._store(key, request, response)
+        elif entry is not None:
+            with self._lock:
+                self._drop(key)
+        return response
+
+    def close(self):
+        self.inner.close()
+
+
+def pytest_addoption(parser):
+    parser.addoption('--http-cache', action='store_true', default=False,
+                     help='Serve repeated GETs from an LRU cache with ETag revalidation')
+    parser.addoption('--http-cache-ttl', action='store', type=float, default=60.0,
+                     help='Seconds a cached GET is served without revalidation')
+    parser.addoption('--http-cache-max-entries', action='store', type=int, default=256)
+    parser.addoption('--http-cache-max-bytes', action='store', type=int, default=8 * 1024 * 1024)
+
+
+def pytest_configure(config):
+    config.addinivalue_line('markers', 'no_cache: requests of this test always go to the wire')
+
+
+def install(config, client):
+    """Mount the cache on client when --http-cache is given; returns the adapter or None."""
+    if not config.getoption('--http-cache'):
+        return None
+    adapter = CachingAdapter(client.adapter, ttl=config.getoption('--http-cache-ttl'),
+                             max_entries=config.getoption('--http-cache-max-entries'),
+                             max_bytes=config.getoption('--http-cache-max-bytes'))
+    client.mount(adapter)
+    config.stash[http_cache_key] = adapter
+    config.stash[cached_client_key] = client
+    return adapter
+
+
+@pytest.hookimpl(hookwrapper=True)
+def pytest_runtest_call(item):
+    client = item.config.stash.get(cached_client_key, None)
+    bypass = client is not None and item.get_closest_marker('no_cache') is not None
+    if bypass:
+        client.test_headers.update(NO_CACHE_HEADERS)
+    yield
+    if bypass:
+        for name in NO_CACHE_HEADERS:
+            client.test_headers.pop(name, None)
+
+
+def _write_environment(report_dir, stats):
+    """Merge the cache statistics into Allure's environment.properties."""
+    path = f'{report_dir}/environment.properties'
+    properties = {}
+    try:
+        with open(path, encoding='utf-8') as existing:
+            for line in existing:
+                key, separator, value = line.rstrip('\n').partition('=')
+                if separator:
+                    properties[key] = value
+    except OSError:
+        pass
+    properties.update((f'http.cache.{name}', str(value)) for name, value in stats.items())
+    with open(path, 'w', encoding='utf-8') as environment:
+        environment.writelines(f'{key}={value}\n' for key, value in properties.items())
+
+
+def collected_stats(config):
+    """This process's cache statistics plus those reported by xdist workers."""
+    cache = config.stash.get(http_cache_key, None)
+    workers = config.stash.get(worker_stats_key, None)
+    if cache is None and workers is None:
+        return None
+    stats = dict(cache.stats) if cache is not None else {}
+    for name, value in (workers or {}).items():
+        stats[name] = stats.get(name, 0) + value
+    return stats
+
+
+@pytest.hookimpl(optionalhook=True)
+def pytest_testnodedown(node, error):
+    stats = getattr(node, 'workeroutput', {}).get('http_cache_stats')
+    if stats:
+        totals = node.config.stash.setdefault(worker_stats_key, {})
+        for name, value in stats.items():
+            totals[name] = totals.get(name, 0) + value
+
+
+def pytest_sessionfinish(session):
+    config = session.config
+    if hasattr(config, 'workerinput'):
+        # the controller merges the statistics of all workers and writes them once
+        cache = config.stash.get(http_cache_key, None)
+        if cache is not None:
+            config.workeroutput['http_cache_stats'] = dict(cache.stats)
+        return
+    stats = collected_stats(config)
+    report_dir = getattr(config.option, 'allure_report_dir', None)
+    if stats is not None and report_dir:
+        _write_environment(report_dir, stats)
+
+
+def pytest_terminal_summary(terminalreporter, config):
+    stats = collected_stats(config)
+    if stats is not None:
+        terminalreporter.section('http cache')
+        terminalreporter.write_line(', '.join(f'{name}={value}' for name, value in stats.items()))
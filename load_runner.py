@@ -0,0 +1,229 @@
+"""Load mode: replay the suite's own scenarios as virtual-user workloads.
+
+    python load_runner.py -m smoke --users 20 --ramp-up 5 --duration 30 --api-target local
+    python load_runner.py test_3_crud.py::TestCRUD --users 5 --iterations 100
+
+Tests are selected with regular pytest arguments (paths, node ids, ``-m``,
+``-k``) and collected once, in the order the chains plugin gives them. Every
+virtual user gets its own pooled client and, per iteration, its own chain
+state, then calls the selected test functions in order. Throughput, error
+rate and latency percentiles are reported per endpoint.
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+
+import pytest
+from _pytest.outcomes import OutcomeException
+
+from api_client import ApiClient
+from auth import AuthProvider
+from cases import read_case
+from chains import PRODUCED_KEYS, ChainState
+from stub_server import StubServer, parse_latency
+from timing import endpoint_of, percentile
+
+
+class LoadStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+        self.exceptions = defaultdict(int)
+        self.scenarios = defaultdict(lambda: {'passed': 0, 'failed': 0, 'skipped': 0})
+        self.started = self.finished = None
+
+    def record_response(self, response, *args, **kwargs):
+        endpoint = endpoint_of(response.request)
+        with self._lock:
+            self.latencies[endpoint].append(response.elapsed.total_seconds())
+            if response.status_code >= 500:
+                self.errors[endpoint] += 1
+
+    def record_exception(self, endpoint):
+        with self._lock:
+            self.latencies.setdefault(endpoint, [])
+            self.exceptions[endpoint] += 1
+            self.errors[endpoint] += 1
+
+    def record_scenario(self, name, outcome):
+        with self._lock:
+            self.scenarios[name][outcome] += 1
+
+    def summary(self):
+        wall = max((self.finished or time.monotonic()) - (self.started or 0), 1e-9)
+        endpoints = {}
+        for endpoint, values in sorted(self.latencies.items()):
+            values = sorted(values)
+            count = len(values) + self.exceptions[endpoint]
+            endpoints[endpoint] = {
+                'requests': count,
+                'rps': round(count / wall, 2),
+                'errors': self.errors[endpoint],
+                'error_rate': round(self.errors[endpoint] / count, 4) if count else 0.0,
+                'p50_ms': round(percentile(values, 0.50) * 1000, 2),
+                'p90_ms': round(percentile(values, 0.90) * 1000, 2),
+                'p95_ms': round(percentile(values, 0.95) * 1000, 2),
+                'p99_ms': round(percentile(values, 0.99) * 1000, 2),
+                'max_ms': round(values[-1] * 1000, 2) if values else 0.0,
+            }
+        return {'wall_seconds': round(wall, 3), 'endpoints': endpoints, 'scenarios': dict(self.scenarios)}
+
+
+class _Collector:
+    def __init__(self):
+        self.items = []
+
+    @pytest.hookimpl(trylast=True)
+    def pytest_collection_modifyitems(self, items):
+        self.items = list(items)
+
+
+def collect(pytest_args):
+    collector = _Collector()
+    code = pytest.main(['--collect-only', '-p', 'no:terminal', '-p', 'no:cacheprovider', *pytest_args],
+                       plugins=[collector])
+    if code not in (pytest.ExitCode.OK, pytest.ExitCode.NO_TESTS_COLLECTED) or not collector.items:
+        raise SystemExit(f'No tests selected for load (pytest exit code {int(code)})')
+    return collector.items
+
+
+LOAD_FIXTURES = ('api_client', 'auth', 'chain', 'case')
+
+
+def check_fixtures(items):
+    """Fail before any virtual user starts if a test needs a fixture load mode cannot provide."""
+    for item in items:
+        for name in item._fixtureinfo.argnames:
+            if name not in LOAD_FIXTURES and name not in PRODUCED_KEYS:
+                raise SystemExit(f'{item.nodeid}: fixture "{name}" is not available in load mode')
+
+
+class VirtualUser(threading.Thread):
+    def __init__(self, number, items, base_url, stats, stop_at, iterations, start_delay):
+        super().__init__(name=f'vu-{number}', daemon=True)
+        self.items = items
+        self.stats = stats
+        self.stop_at = stop_at
+        self.iterations = iterations
+        self.start_delay = start_delay
+        self.client = ApiClient(base_url=base_url, pool_connections=1, pool_maxsize=1)
+        self.client.session.hooks['response'].append(stats.record_response)
+        # every user logs in on its own, with a token cache nobody else shares
+        self._auth_dir = tempfile.TemporaryDirectory(prefix=f'{self.name}-')
+        self.auth = AuthProvider(self.client, os.path.join(self._auth_dir.name, 'auth_token.json'))
+
+    def run(self):
+        time.sleep(self.start_delay)
+        done = 0
+        while (self.iterations is None or done < self.iterations) and time.monotonic() < self.stop_at:
+            chain = ChainState(self.name)
+            for item in self.items:
+                self.run_item(item, chain)
+            done += 1
+        self.client.close()
+
+    def run_item(self, item, chain):
+        kwargs = {}
+        for name in item._fixtureinfo.argnames:
+            if name == 'api_client':
+                kwargs[name] = self.client
+            elif name == 'auth':
+                kwargs[name] = self.auth
+            elif name == 'chain':
+                kwargs[name] = chain
+            elif name == 'case':
+                kwargs[name] = read_case(item.callspec.params['case'])
+            elif name not in chain.values:
+                self.stats.record_scenario(item.name, 'skipped')
+                return
+            else:
+                kwargs[name] = chain.values[name]
+        try:
+            item.obj(**kwargs)
+        except pytest.skip.Exception:
+            self.stats.record_scenario(item.name, 'skipped')
+        except (AssertionError, OutcomeException):
+            self.stats.record_scenario(item.name, 'failed')
+        except Exception as error:
+            request = getattr(error, 'request', None)
+            self.stats.record_exception(endpoint_of(request) if request is not None else type(error).__name__)
+            self.stats.record_scenario(item.name, 'failed')
+        else:
+            self.stats.record_scenario(item.name, 'passed')
+
+
+def run_load(items, base_url, users, ramp_up=0.0, duration=None, iterations=None):
+    if duration is None and iterations is None:
+        iterations = 1
+    check_fixtures(items)
+    stats = LoadStats()
+    stats.started = time.monotonic()
+    stop_at = stats.started + (ramp_up + duration if duration is not None else float('inf'))
+    workers = [
+        VirtualUser(number, items, base_url, stats, stop_at, iterations, ramp_up * number / users)
+        for number in range(users)
+    ]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    stats.finished = time.monotonic()
+    return stats.summary()
+
+
+def format_report(summary):
+    lines = [f'{"endpoint":<28}{"reqs":>8}{"rps":>10}{"err%":>8}{"p50":>9}{"p90":>9}{"p95":>9}{"p99":>9}{"max":>9}']
+    for endpoint, row in summary['endpoints'].items():
+        lines.append(f'{endpoint:<28}{row["requests"]:>8}{row["rps"]:>10.1f}{row["error_rate"] * 100:>7.2f}%'
+                     f'{row["p50_ms"]:>9.1f}{row["p90_ms"]:>9.1f}{row["p95_ms"]:>9.1f}{row["p99_ms"]:>9.1f}'
+                     f'{row["max_ms"]:>9.1f}')
+    lines.append('')
+    for name, outcome in summary['scenarios'].items():
+        lines.append(f'{name:<40} passed={outcome["passed"]} failed={outcome["failed"]} skipped={outcome["skipped"]}')
+    lines.append(f'wall time: {summary["wall_seconds"]:.2f}s (latencies in ms)')
+    return '\n'.join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Run the API test scenarios as a load test.')
+    parser.add_argument('--users', type=int, default=1, help='Number of concurrent virtual users')
+    parser.add_argument('--ramp-up', type=float, default=0.0, help='Seconds over which users are started')
+    parser.add_argument('--duration', type=float, help='Seconds to keep running after ramp-up')
+    parser.add_argument('--iterations', type=int, help='Scenario iterations per virtual user')
+    parser.add_argument('--api-target', choices=('live', 'local'), default='live')
+    parser.add_argument('--base-url', default=ApiClient.base_url)
+    parser.add_argument('--stub-latency', action='append', default=[], metavar='ROUTE=SECONDS')
+    parser.add_argument('--json', dest='json_path', help='Also write the summary as JSON to this file')
+    options, pytest_args = parser.parse_known_args(argv)
+
+    items = collect(pytest_args)
+    if options.api_target != 'local':
+        items = [item for item in items if item.get_closest_marker('stand_in') is None]
+    server = None
+    base_url = options.base_url
+    if options.api_target == 'local':
+        server = StubServer(latency=parse_latency(options.stub_latency)).start()
+        base_url = server.base_url
+    try:
+        summary = run_load(items, base_url, options.users, options.ramp_up, options.duration, options.iterations)
+    finally:
+        if server is not None:
+            server.stop()
+
+    print(format_report(summary))
+    if options.json_path:
+        with open(options.json_path, 'w') as report:
+            json.dump(summary, report, indent=2)
+    errors = sum(row['errors'] for row in summary['endpoints'].values())
+    failed = sum(outcome['failed'] for outcome in summary['scenarios'].values())
+    return 1 if errors or failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
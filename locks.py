@@ -0,0 +1,19 @@
+"""Inter-process file lock shared by the auth token cache and the cassette recorder."""
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows: callers' in-process locks still protect threads
+    fcntl = None
+
+
+@contextmanager
+def file_lock(path):
+    with open(path, 'a+') as handle:
+        if fcntl is not None:
+            fcntl.flock(handle, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(handle, fcntl.LOCK_UN)
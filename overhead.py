@@ -0,0 +1,300 @@
+"""Harness-overhead profiling: where does a test's time go besides the API?
+
+    pytest --profile-overhead [--profile-collapsed overhead.collapsed]
+
+Wall and CPU (``time.thread_time``) time of every test is split into phases:
+
+* setup / teardown: fixture setup and finalization
+* http: ``ApiClient.send``, i.e. the request on the wire, and
+  ``ApiClient.receive``, waiting for one sent on another thread (crawled
+  pages, prefetched responses)
+* json_decode: ``response.json()``
+* allure_steps: entering and leaving ``allure.step`` blocks
+* attachments: ``attach`` / ``allure.attach``
+* test_code: the rest of the test function body
+* reporting: the rest of the run-test protocol, i.e. report hooks and Allure result writing
+
+Setup and finalization of fixtures scoped wider than a function (the stub
+server, the shared client, ...) happen inside whichever test first needs or
+last uses them. They are taken out of that test and reported separately as
+session_setup / session_teardown, so they do not skew the per-test numbers.
+
+Each phase counts only its own time; nested instrumented calls are charged to
+the inner phase. Only the thread running the test is measured; requests sent on
+other threads count as http while the test waits for them. ``--profile-collapsed`` also
+samples the test thread's stack every ``--profile-interval`` seconds and
+writes ``frame;frame;frame count`` lines for flamegraph.pl / speedscope.
+
+PYTEST_DONT_REWRITE
+"""
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from functools import wraps
+
+import allure
+import allure_commons._allure
+import pytest
+import requests
+
+from api_client import ApiClient
+from attachments import AttachmentSink
+from timing import TimedResponse
+
+PHASES = ('setup', 'http', 'json_decode', 'allure_steps', 'attachments', 'test_code', 'teardown', 'reporting')
+SHARED_PHASES = ('session_setup', 'session_teardown')
+
+overhead_profiler_key = pytest.StashKey()
+
+
+class OverheadProfiler:
+    def __init__(self, interval=None):
+        self.tests = {}
+        # time of wider-scoped fixtures, not charged to the test they happen in
+        self.shared = {}
+        self.current = None
+        self.thread = None
+        self.interval = interval
+        self.samples = Counter()
+        self._stack = []
+        self.finalizing = {}
+        # > 0 inside a session_setup/session_teardown measurement, which then includes everything nested
+        self._shared_depth = 0
+        self._patched = []
+        self._sampler = None
+        self._stopped = threading.Event()
+
+    def begin(self):
+        """Open a measurement on the test thread; returns a token for end(), or None when not measuring."""
+        if self.current is None or threading.get_ident() != self.thread or self._shared_depth:
+            return None
+        children = [0.0, 0.0]
+        self._stack.append(children)
+        return children, time.perf_counter(), time.thread_time()
+
+    def begin_shared(self):
+        token = self.begin()
+        if token is not None:
+            self._shared_depth += 1
+        return token
+
+    def end_shared(self, token, phase):
+        if token is not None:
+            self._shared_depth -= 1
+            self.end(token, phase, shared=True)
+
+    def end(self, token, phase, shared=False):
+        if token is None:
+            return
+        children, wall, cpu = token
+        wall, cpu = time.perf_counter() - wall, time.thread_time() - cpu
+        self._stack.pop()
+        totals = (self.shared if shared else self.current).setdefault(phase, [0.0, 0.0])
+        totals[0] += wall - children[0]
+        totals[1] += cpu - children[1]
+        if self._stack:
+            self._stack[-1][0] += wall
+            self._stack[-1][1] += cpu
+
+    @contextmanager
+    def measure(self, phase):
+        token = self.begin()
+        try:
+            yield
+        finally:
+            self.end(token, phase)
+
+    def instrument(self, owner, name, phase):
+        original = getattr(owner, name)
+        own = name in vars(owner)
+        profiler = self
+
+        @wraps(original)
+        def wrapper(*args, **kwargs):
+            with profiler.measure(phase):
+                return original(*args, **kwargs)
+
+        setattr(owner, name, wrapper)
+        self._patched.append((owner, name, original if own else None))
+
+    def install(self):
+        self.instrument(ApiClient, 'send', 'http')
+        self.instrument(ApiClient, 'receive', 'http')
+        self.instrument(requests.Response, 'json', 'json_decode')
+        self.instrument(TimedResponse, 'json', 'json_decode')
+        self.instrument(allure_commons._allure.StepContext, '__enter__', 'allure_steps')
+        self.instrument(allure_commons._allure.StepContext, '__exit__', 'allure_steps')
+        self.instrument(AttachmentSink, 'attach', 'attachments')
+        self.instrument(type(allure.attach), '__call__', 'attachments')
+        if self.interval:
+            self._sampler = threading.Thread(target=self._sample_loop, name='overhead-sampler', daemon=True)
+            self._sampler.start()
+
+    def uninstall(self):
+        while self._patched:
+            owner, name, original = self._patched.pop()
+            if original is None:
+                delattr(owner, name)
+            else:
+                setattr(owner, name, original)
+        if self._sampler is not None:
+            self._stopped.set()
+            self._sampler.join()
+            self._sampler = None
+
+    @contextmanager
+    def test(self, nodeid):
+        self.current = self.tests.setdefault(nodeid, {})
+        self.thread = threading.get_ident()
+        try:
+            with self.measure('reporting'):
+                yield
+        finally:
+            self.current = None
+
+    def _sample_loop(self):
+        while not self._stopped.wait(self.interval):
+            if self.current is None:
+                continue
+            frame = sys._current_frames().get(self.thread)
+            stack = []
+            while frame is not None:
+                stack.append(f'{os.path.basename(frame.f_code.co_filename)}:{frame.f_code.co_name}')
+                frame = frame.f_back
+            if stack:
+                self.samples[';'.join(reversed(stack))] += 1
+
+    def write_collapsed(self, path):
+        with open(path, 'w', encoding='utf-8') as output:
+            output.writelines(f'{stack} {count}\n' for stack, count in self.samples.most_common())
+
+    def totals(self):
+        totals = {phase: [0.0, 0.0] for phase in PHASES}
+        for phases in self.tests.values():
+            for phase, (wall, cpu) in phases.items():
+                totals[phase][0] += wall
+                totals[phase][1] += cpu
+        return totals
+
+
+def pytest_addoption(parser):
+    parser.addoption('--profile-overhead', action='store_true', default=False,
+                     help='Split each test\'s wall and CPU time into harness phases and print a summary')
+    parser.addoption('--profile-collapsed', action='store', default=None, metavar='PATH',
+                     help='With --profile-overhead, also write a sampled collapsed-stack profile to PATH')
+    parser.addoption('--profile-interval', action='store', type=float, default=0.001,
+                     help='Stack sampling interval in seconds for --profile-collapsed')
+
+
+def pytest_configure(config):
+    if config.getoption('--profile-overhead'):
+        profiler = OverheadProfiler(config.getoption('--profile-interval') if config.getoption('--profile-collapsed')
+                                    else None)
+        profiler.install()
+        config.stash[overhead_profiler_key] = profiler
+
+
+@pytest.hookimpl(hookwrapper=True, tryfirst=True)
+def pytest_runtest_protocol(item):
+    profiler = item.config.stash.get(overhead_profiler_key, None)
+    if profiler is None:
+        yield
+        return
+    with profiler.test(item.nodeid):
+        yield
+
+
+@pytest.hookimpl(hookwrapper=True, tryfirst=True)
+def pytest_runtest_setup(item):
+    profiler = item.config.stash.get(overhead_profiler_key, None)
+    if profiler is None:
+        yield
+        return
+    with profiler.measure('setup'):
+        yield
+
+
+@pytest.hookimpl(hookwrapper=True, tryfirst=True)
+def pytest_runtest_call(item):
+    profiler = item.config.stash.get(overhead_profiler_key, None)
+    if profiler is None:
+        yield
+        return
+    with profiler.measure('test_code'):
+        yield
+
+
+@pytest.hookimpl(hookwrapper=True, tryfirst=True)
+def pytest_fixture_setup(fixturedef, request):
+    profiler = request.config.stash.get(overhead_profiler_key, None)
+    if profiler is None or fixturedef.scope == 'function':
+        yield
+        return
+    token = profiler.begin_shared()
+    try:
+        yield
+    finally:
+        profiler.end_shared(token, 'session_setup')
+    # finalizers run last-in first-out: this one starts the clock for the fixture's own teardown,
+    # pytest_fixture_post_finalizer stops it
+    fixturedef.addfinalizer(lambda: profiler.finalizing.__setitem__(id(fixturedef), profiler.begin_shared()))
+
+
+def pytest_fixture_post_finalizer(fixturedef, request):
+    profiler = request.config.stash.get(overhead_profiler_key, None)
+    if profiler is not None and id(fixturedef) in profiler.finalizing:
+        profiler.end_shared(profiler.finalizing.pop(id(fixturedef)), 'session_teardown')
+
+
+@pytest.hookimpl(hookwrapper=True, tryfirst=True)
+def pytest_runtest_teardown(item):
+    profiler = item.config.stash.get(overhead_profiler_key, None)
+    if profiler is None:
+        yield
+        return
+    with profiler.measure('teardown'):
+        yield
+
+
+def pytest_sessionfinish(session):
+    profiler = session.config.stash.get(overhead_profiler_key, None)
+    if profiler is not None and session.config.getoption('--profile-collapsed'):
+        profiler.write_collapsed(session.config.getoption('--profile-collapsed'))
+
+
+def pytest_terminal_summary(terminalreporter, config):
+    profiler = config.stash.get(overhead_profiler_key, None)
+    if profiler is None or not profiler.tests:
+        return
+    totals = profiler.totals()
+    shared = {phase: profiler.shared.get(phase, [0.0, 0.0]) for phase in SHARED_PHASES}
+    wall_total = sum(wall for wall, _ in [*totals.values(), *shared.values()]) or 1.0
+    terminalreporter.section(f'harness overhead over {len(profiler.tests)} tests (ms)')
+    terminalreporter.write_line(f'{"phase":<16}{"wall":>12}{"cpu":>12}{"% wall":>10}{"per test":>12}')
+    for phase in PHASES:
+        wall, cpu = totals[phase]
+        terminalreporter.write_line(f'{phase:<16}{wall * 1000:>12.2f}{cpu * 1000:>12.2f}'
+                                    f'{wall / wall_total * 100:>9.1f}%{wall / len(profiler.tests) * 1000:>12.3f}')
+    for phase, (wall, cpu) in shared.items():
+        terminalreporter.write_line(f'{phase:<16}{wall * 1000:>12.2f}{cpu * 1000:>12.2f}'
+                                    f'{wall / wall_total * 100:>9.1f}%{"-":>12}')
+
+    def harness(phases):
+        return sum(wall for phase, (wall, _) in phases.items() if phase != 'http')
+
+    terminalreporter.write_line('')
+    terminalreporter.write_line('most harness time (everything but http):')
+    for nodeid, phases in sorted(profiler.tests.items(), key=lambda test: -harness(test[1]))[:5]:
+        terminalreporter.write_line(f'{harness(phases) * 1000:>10.2f}  {nodeid}')
+    if profiler.samples:
+        terminalreporter.write_line(f'collapsed stacks: {sum(profiler.samples.values())} samples written to '
+                                    f'{config.getoption("--profile-collapsed")}')
+
+
+def pytest_unconfigure(config):
+    profiler = config.stash.get(overhead_profiler_key, None)
+    if profiler is not None:
+        profiler.uninstall()
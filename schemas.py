@@ -0,0 +1,93 @@
+"""Response schemas built from the UsedData field lists.
+
+A schema is compiled once into a tuple of (key, check) pairs. Validation makes
+a single pass over the payload, checks every item of nested arrays and
+collects all violations instead of stopping at the first one. Paths of failing
+values are only rendered when something is actually wrong.
+"""
+from used_data import UsedData
+
+FIELD_TYPES = {
+    'page': int, 'per_page': int, 'total': int, 'total_pages': int, 'data': list,
+    'id': int, 'email': str, 'first_name': str, 'last_name': str, 'avatar': str,
+    'name': str, 'year': int, 'color': str, 'pantone_value': str,
+    'url': str, 'text': str,
+}
+
+
+def _render(path):
+    parts = []
+    while path:
+        path, key = path
+        parts.append(f'[{key}]' if isinstance(key, int) else f'.{key}')
+    return '$' + ''.join(reversed(parts))
+
+
+def _type_check(expected):
+    def check(value, path, errors):
+        if type(value) is not expected:
+            errors.append(f'{_render(path)}: expected {expected.__name__}, got {type(value).__name__}')
+    return check
+
+
+def _array_check(item_schema):
+    validate_item = item_schema.validate_into
+
+    def check(value, path, errors):
+        if type(value) is not list:
+            errors.append(f'{_render(path)}: expected list, got {type(value).__name__}')
+            return
+        for index, item in enumerate(value):
+            validate_item(item, (path, index), errors)
+    return check
+
+
+class Schema:
+    """fields maps key -> type, nested Schema or [Schema] for arrays of objects."""
+
+    def __init__(self, name, fields, required=None):
+        self.name = name
+        self.fields = fields
+        self.required = frozenset(fields if required is None else required)
+        self._checks = tuple((key, self._compile(spec)) for key, spec in fields.items())
+
+    @staticmethod
+    def _compile(spec):
+        if isinstance(spec, Schema):
+            return spec.validate_into
+        if isinstance(spec, list):
+            return _array_check(spec[0])
+        return _type_check(spec)
+
+    @classmethod
+    def from_fields(cls, name, field_names, **nested):
+        """Build a schema from a UsedData-style key list, typed via FIELD_TYPES."""
+        fields = {key: nested.get(key, FIELD_TYPES[key]) for key in field_names}
+        fields.update((key, spec) for key, spec in nested.items() if key not in fields)
+        return cls(name, fields)
+
+    def validate_into(self, obj, path, errors):
+        if type(obj) is not dict:
+            errors.append(f'{_render(path)}: expected {self.name} object, got {type(obj).__name__}')
+            return
+        for key, check in self._checks:
+            if key in obj:
+                check(obj[key], (path, key), errors)
+            elif key in self.required:
+                errors.append(f'{_render((path, key))}: missing required key')
+
+    def errors(self, obj):
+        """All violations of obj against this schema, empty when it is valid."""
+        errors = []
+        self.validate_into(obj, None, errors)
+        return errors
+
+
+SUPPORT = Schema.from_fields('support', UsedData.support_info)
+USER = Schema.from_fields('user', UsedData.user_data_info)
+RESOURCE = Schema.from_fields('resource', UsedData.resource_data_info)
+
+USER_LIST = Schema.from_fields('user list', UsedData.list_data_info, data=[USER], support=SUPPORT)
+RESOURCE_LIST = Schema.from_fields('resource list', UsedData.list_data_info, data=[RESOURCE], support=SUPPORT)
+SINGLE_USER = Schema('single user', {'data': USER, 'support': SUPPORT})
+SINGLE_RESOURCE = Schema('single resource', {'data': RESOURCE, 'support': SUPPORT})
@@ -0,0 +1,129 @@
+"""Duration-aware test sharding from Allure history.
+
+    pytest --shards 4 --shard-id 0 --alluredir=allure-results
+
+Past durations come from the allure_index SQLite store when it exists, or
+from the start/stop stamps of ``*-result.json`` files in a results directory.
+Producer/consumer chains are kept together as one unit. Units are spread
+over the shards with the longest-processing-time heuristic: longest first,
+each onto the currently lightest shard. Tests without history are costed at
+the median of the known durations.
+
+PYTEST_DONT_REWRITE
+"""
+import heapq
+import json
+import os
+import sqlite3
+import statistics
+from pathlib import Path
+
+import pytest
+from allure_pytest.utils import allure_full_name
+
+from allure_index import DEFAULT_DB
+from chains import chain_of_item_key
+
+FALLBACK_DURATION = 1.0
+shard_plan_key = pytest.StashKey()
+
+
+def durations_from_index(db_path, runs=20):
+    connection = sqlite3.connect(db_path)
+    try:
+        rows = connection.execute("""
+            SELECT full_name, AVG(duration) FROM results
+            WHERE duration IS NOT NULL AND status != 'skipped'
+              AND run_id > (SELECT COALESCE(MAX(id), 0) FROM runs) - ?
+            GROUP BY full_name
+        """, (runs,)).fetchall()
+    except sqlite3.Error:
+        return {}
+    finally:
+        connection.close()
+    return {full_name: average / 1000 for full_name, average in rows}
+
+
+def durations_from_results(results_dir):
+    samples = {}
+    for path in Path(results_dir).glob('*-result.json'):
+        try:
+            data = json.loads(path.read_text(encoding='utf-8'))
+        except ValueError:
+            continue
+        if data.get('status') != 'skipped' and data.get('start') is not None and data.get('stop') is not None:
+            samples.setdefault(data.get('fullName'), []).append((data['stop'] - data['start']) / 1000)
+    return {full_name: sum(values) / len(values) for full_name, values in samples.items()}
+
+
+def load_durations(source):
+    if source and os.path.isfile(source):
+        return durations_from_index(source)
+    if source and os.path.isdir(source):
+        return durations_from_results(source)
+    return {}
+
+
+def plan_shards(units, shards):
+    """units: [(name, duration, payload)] -> list of (load, [payload, ...]) per shard, LPT order."""
+    heap = [(0.0, index) for index in range(shards)]
+    assignment = [[] for _ in range(shards)]
+    loads = [0.0] * shards
+    for name, duration, payload in sorted(units, key=lambda unit: (-unit[1], unit[0])):
+        load, index = heapq.heappop(heap)
+        assignment[index].append(payload)
+        loads[index] = load + duration
+        heapq.heappush(heap, (loads[index], index))
+    return list(zip(loads, assignment))
+
+
+def pytest_addoption(parser):
+    parser.addoption('--shards', action='store', type=int, default=1,
+                     help='Split the selected tests into this many duration-balanced shards')
+    parser.addoption('--shard-id', action='store', type=int, default=0,
+                     help='Which shard to run, 0-based')
+    parser.addoption('--shard-history', action='store', default=None,
+                     help=f'allure_index SQLite file or allure-results directory with past durations '
+                          f'(default: {DEFAULT_DB} if present, else allure-results)')
+
+
+@pytest.hookimpl(trylast=True)
+def pytest_collection_modifyitems(config, items):
+    shards, shard_id = config.getoption('--shards'), config.getoption('--shard-id')
+    if shards <= 1:
+        return
+    if not 0 <= shard_id < shards:
+        raise pytest.UsageError(f'--shard-id must be between 0 and {shards - 1}')
+
+    source = config.getoption('--shard-history')
+    if source is None:
+        source = DEFAULT_DB if os.path.isfile(DEFAULT_DB) else 'allure-results'
+    durations = load_durations(source)
+    default = statistics.median(durations.values()) if durations else FALLBACK_DURATION
+
+    units = {}
+    for item in items:
+        unit = item.stash.get(chain_of_item_key, item.nodeid)
+        units.setdefault(unit, []).append(item)
+    plan = plan_shards(
+        [(name, sum(durations.get(allure_full_name(item), default) for item in members), name)
+         for name, members in units.items()],
+        shards,
+    )
+
+    load, selected_units = plan[shard_id]
+    selected = {id(item) for unit in selected_units for item in units[unit]}
+    kept = [item for item in items if id(item) in selected]
+    deselected = [item for item in items if id(item) not in selected]
+    config.stash[shard_plan_key] = (shard_id, shards, len(kept), load, [shard_load for shard_load, _ in plan])
+    if deselected:
+        config.hook.pytest_deselected(items=deselected)
+    items[:] = kept
+
+
+def pytest_report_collectionfinish(config):
+    plan = config.stash.get(shard_plan_key, None)
+    if plan is not None:
+        shard_id, shards, count, load, loads = plan
+        estimates = ', '.join(f'{shard_load:.1f}s' for shard_load in loads)
+        return f'shard {shard_id + 1}/{shards}: {count} tests, estimated {load:.1f}s (all shards: {estimates})'
@@ -0,0 +1,232 @@
+import hashlib
+import json
+import re
+import threading
+import time
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+PER_PAGE = 6
+TOKEN = 'QpwL5tke4Pnpja7X4'
+SUPPORT = {
+    'url': 'https://reqres.in/#support-heading',
+    'text': 'To keep ReqRes free, contributions towards server costs are appreciated!',
+}
+
+_USERS = [
+    ('george.bluth', 'George', 'Bluth'), ('janet.weaver', 'Janet', 'Weaver'), ('emma.wong', 'Emma', 'Wong'),
+    ('eve.holt', 'Eve', 'Holt'), ('charles.morris', 'Charles', 'Morris'), ('tracey.ramos', 'Tracey', 'Ramos'),
+    ('michael.lawson', 'Michael', 'Lawson'), ('lindsay.ferguson', 'Lindsay', 'Ferguson'),
+    ('tobias.funke', 'Tobias', 'Funke'), ('byron.fields', 'Byron', 'Fields'),
+    ('george.edwards', 'George', 'Edwards'), ('rachel.howell', 'Rachel', 'Howell'),
+]
+USERS = [
+    {'id': i, 'email': f'{login}@reqres.in', 'first_name': first, 'last_name': last,
+     'avatar': f'https://reqres.in/img/faces/{i}-image.jpg'}
+    for i, (login, first, last) in enumerate(_USERS, start=1)
+]
+
+_RESOURCES = [
+    ('cerulean', '#98B2D1', '15-4020'), ('fuchsia rose', '#C74375', '17-2031'), ('true red', '#BF1932', '19-1664'),
+    ('aqua sky', '#7BC4C4', '14-4811'), ('tigerlily', '#E2583E', '17-1456'), ('blue turquoise', '#53B0AE', '15-5217'),
+    ('sand dollar', '#DECDBE', '13-1106'), ('chili pepper', '#9B1B30', '19-1557'), ('blue iris', '#5A5B9F', '18-3943'),
+    ('mimosa', '#F0C05A', '14-0848'), ('turquoise', '#45B5AA', '15-5519'), ('honeysuckle', '#D94F70', '18-2120'),
+]
+RESOURCES = [
+    {'id': i, 'name': name, 'year': 1999 + i, 'color': color, 'pantone_value': pantone}
+    for i, (name, color, pantone) in enumerate(_RESOURCES, start=1)
+]
+
+COLLECTIONS = {'users': USERS, 'unknown': RESOURCES}
+REGISTERED = {'eve.holt@reqres.in': 4}
+
+
+def _now():
+    return datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%S.%f')[:-3] + 'Z'
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    # headers and body go out in separate writes; without this Nagle + delayed ACK add ~40 ms per response
+    disable_nagle_algorithm = True
+    collection_re = re.compile(r'^/api/(users|unknown)/?$')
+    item_re = re.compile(r'^/api/(users|unknown)/(\d+)$')
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        self._dispatch('GET')
+
+    def do_POST(self):
+        self._dispatch('POST')
+
+    def do_PUT(self):
+        self._dispatch('PUT')
+
+    def do_PATCH(self):
+        self._dispatch('PATCH')
+
+    def do_DELETE(self):
+        self._dispatch('DELETE')
+
+    def _dispatch(self, method):
+        parts = urlsplit(self.path)
+        query = {key: values[-1] for key, values in parse_qs(parts.query).items()}
+        body = self._read_body()
+
+        delay = self.server.latency_for(parts.path)
+        if query.get('delay', '').isdigit():
+            delay += int(query['delay'])
+        if delay:
+            time.sleep(delay)
+
+        status, payload = self.route(method, parts.path, query, body)
+        etag = None
+        if method == 'GET' and status == 200:
+            etag = f'W/"{hashlib.sha1(json.dumps(payload).encode()).hexdigest()[:16]}"'
+            if self.headers.get('If-None-Match') == etag:
+                status, payload = 304, None
+        self._send(status, payload, etag)
+
+    def _read_body(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        if not length:
+            return {}
+        try:
+            return json.loads(self.rfile.read(length))
+        except ValueError:
+            return {}
+
+    def _send(self, status, payload, etag=None):
+        raw = b'' if payload is None else json.dumps(payload).encode()
+        self.send_response(status)
+        if payload is not None:
+            self.send_header('Content-Type', 'application/json; charset=utf-8')
+        if etag is not None:
+            self.send_header('ETag', etag)
+        # echo it, so the client drops the socket instead of returning it to its pool
+        if self.headers.get('Connection', '').lower() == 'close':
+            self.send_header('Connection', 'close')
+        self.send_header('Content-Length', str(len(raw)))
+        self.end_headers()
+        self.wfile.write(raw)
+
+    def route(self, method, path, query, body):
+        match = self.collection_re.match(path)
+        if match:
+            if method == 'GET':
+                return self.list_page(COLLECTIONS[match.group(1)], query)
+            if method == 'POST':
+                return 201, dict(body, id=str(len(USERS) + self.server.next_id()), createdAt=_now())
+
+        match = self.item_re.match(path)
+        if match:
+            if method == 'GET':
+                return self.single(COLLECTIONS[match.group(1)], int(match.group(2)))
+            if method in ('PUT', 'PATCH'):
+                return 200, dict(body, updatedAt=_now())
+            if method == 'DELETE':
+                return 204, None
+
+        if method == 'POST' and path == '/api/register':
+            return self.register(body)
+        if method == 'POST' and path == '/api/login':
+            return self.login(body)
+        if method == 'GET' and path == '/api/session':
+            return self.session(self.headers.get('Authorization'))
+        return 404, {}
+
+    @staticmethod
+    def list_page(items, query):
+        page = int(query['page']) if query.get('page', '').isdigit() else 1
+        total_pages = -(-len(items) // PER_PAGE)
+        start = (page - 1) * PER_PAGE
+        return 200, {
+            'page': page, 'per_page': PER_PAGE, 'total': len(items), 'total_pages': total_pages,
+            'data': items[start:start + PER_PAGE], 'support': SUPPORT,
+        }
+
+    @staticmethod
+    def single(items, item_id):
+        if 1 <= item_id <= len(items):
+            return 200, {'data': items[item_id - 1], 'support': SUPPORT}
+        return 404, {}
+
+    @staticmethod
+    def register(body):
+        if not body.get('email') and not body.get('username'):
+            return 400, {'error': 'Missing email or username'}
+        if not body.get('password'):
+            return 400, {'error': 'Missing password'}
+        if body.get('email') not in REGISTERED:
+            return 400, {'error': 'Note: Only defined users succeed registration'}
+        return 200, {'id': REGISTERED[body['email']], 'token': TOKEN}
+
+    @staticmethod
+    def login(body):
+        if not body.get('email') and not body.get('username'):
+            return 400, {'error': 'Missing email or username'}
+        if not body.get('password'):
+            return 400, {'error': 'Missing password'}
+        if body.get('email') not in REGISTERED:
+            return 400, {'error': 'user not found'}
+        return 200, {'token': TOKEN}
+
+    @staticmethod
+    def session(authorization):
+        # stand-in only: the current token is the one login hands out, anything else is stale
+        if authorization != f'Bearer {TOKEN}':
+            return 401, {'error': 'Missing or expired token'}
+        return 200, {'data': USERS[REGISTERED['eve.holt@reqres.in'] - 1], 'support': SUPPORT}
+
+
+class StubServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, host='127.0.0.1', port=0, latency=None, handler=StubHandler):
+        super().__init__((host, port), handler)
+        self.latency = dict(latency or {})
+        self._thread = None
+        self._ids = 0
+        self._ids_lock = threading.Lock()
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f'http://{host}:{port}'
+
+    @property
+    def base_url(self):
+        return f'{self.url}/api'
+
+    def latency_for(self, path):
+        """Longest configured route prefix wins, e.g. {'/api/users': 0.05}."""
+        matches = [prefix for prefix in self.latency if path.startswith(prefix)]
+        return self.latency[max(matches, key=len)] if matches else 0
+
+    def next_id(self):
+        with self._ids_lock:
+            self._ids += 1
+            return self._ids
+
+    def start(self):
+        self._thread = threading.Thread(target=self.serve_forever, name='stub-server', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+        if self._thread is not None:
+            self._thread.join()
+
+
+def parse_latency(specs):
+    """Turn ['/api/users=0.05', ...] CLI values into a route -> seconds mapping."""
+    latency = {}
+    for spec in specs or []:
+        route, _, seconds = spec.partition('=')
+        latency[route] = float(seconds)
+    return latency
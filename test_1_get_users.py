@@ -1,8 +1,8 @@
-import requests
 import pytest
 import allure
-import time
-from used_data import UsedData
+from attachments import attach
+import schemas
+from pagination import PageCrawler
 
 
 @pytest.mark.api
@@ -13,13 +13,13 @@ class TestGetUsers:
     @allure.story('Get list of users from API')
     @allure.severity(allure.severity_level.CRITICAL)
     @allure.description('This test verifies that the API returns the list of users correctly for the specified page.')
-
-    def test_get_list_users(self):
+    @pytest.mark.produces('user_id')
+    @pytest.mark.prefetch('GET', '/users?page=1')
+    def test_get_list_users(self, api_client, chain):
         page = 1
-        list_data_info = UsedData.list_data_info
 
         with allure.step(f'Send GET request to retrieve list of users on page {page}'):
-            response = requests.get(f'https://reqres.in/api/users?page={page}')
+            response = api_client.get(f'/users?page={page}')
 
         with allure.step('Verify that the response status code is 200'):
             assert response.status_code == 200, (
@@ -28,14 +28,33 @@ class TestGetUsers:
 
         response_data = response.json()
 
-        with allure.step('Check if the necessary information is present in the response'):
-            for info in list_data_info:
-                assert info in response_data, 'There is an "List of Users" GET ERROR: Needed information inconsistency.'
+        with allure.step('Check that the response matches the users list schema'):
+            violations = schemas.USER_LIST.errors(response_data)
+            assert not violations, f'There is an "List of Users" GET ERROR: Needed information inconsistency: {violations}'
 
         if response_data['data'] is not None:
-            UsedData.user_id = response_data['data'][0]['id']
+            chain.publish('user_id', response_data['data'][0]['id'])
+
+        attach(response.text, name='Response JSON', attachment_type=allure.attachment_type.JSON)
+
+
+    @allure.feature('User List Retrieval')
+    @allure.story('Get all pages of users from API')
+    @allure.severity(allure.severity_level.NORMAL)
+    @allure.description('This test verifies that every page of the users list is consistent and matches the schema.')
 
-        allure.attach(response.text, name='Response JSON', attachment_type=allure.attachment_type.JSON)
+    def test_get_all_users_pages(self, api_client):
+        crawler = PageCrawler(api_client, '/users', schemas.USER_LIST)
+
+        with allure.step('Fetch every page of the users list'):
+            items_seen, violations = crawler.crawl()
+
+        with allure.step('Verify that the whole collection is consistent'):
+            assert items_seen > 0, 'There is an "All Users Pages" GET ERROR: no users were served.'
+            assert not violations, f'There is an "All Users Pages" GET ERROR: Data inconsistency: {violations}'
+
+        attach(f'{items_seen} users on {crawler.pages_fetched} pages', name='Crawl summary',
+               attachment_type=allure.attachment_type.TEXT)
 
 
     @allure.feature('User Retrieval')
@@ -44,13 +63,10 @@ class TestGetUsers:
     @allure.description(
         'This test verifies that the API returns the details of a single user correctly for the specified user ID.')
 
-    def test_get_single_user(self):
-
-        user_id = UsedData.user_id
-        user_data_info = UsedData.user_data_info
+    def test_get_single_user(self, api_client, user_id):
 
         with allure.step(f'Send GET request to retrieve details of user with ID {user_id}'):
-            response = requests.get(f'https://reqres.in/api/users/{user_id}')
+            response = api_client.get(f'/users/{user_id}')
 
         with allure.step('Verify that the response status code is 200'):
             assert response.status_code == 200, (
@@ -59,14 +75,14 @@ class TestGetUsers:
 
         response_data = response.json()
 
-        with allure.step('Check if the necessary user information is present in the response'):
-            for info in user_data_info:
-                assert info in response_data['data'], f'There is an "Single User GET ERROR: {info} inconsistency.'
+        with allure.step('Check that the response matches the single user schema'):
+            violations = schemas.SINGLE_USER.errors(response_data)
+            assert not violations, f'There is an "Single User GET ERROR: {violations} inconsistency.'
 
         with allure.step(f'Verify that the user ID in the response matches the requested user ID {user_id}'):
             assert response_data['data']['id'] == user_id, f'There is an "Single User GET ERROR: user "id" is incorrect.'
 
-        allure.attach(response.text, name='Response JSON', attachment_type=allure.attachment_type.JSON)
+        attach(response.text, name='Response JSON', attachment_type=allure.attachment_type.JSON)
 
 
 
@@ -74,12 +90,14 @@ class TestGetUsers:
     @allure.story('Get single user not found')
     @allure.severity(allure.severity_level.NORMAL)
     @allure.description('This test verifies that the API returns a 404 status code when a user is not found.')
+    @pytest.mark.prefetch('GET', '/users/25')
+    @pytest.mark.no_cache
 
-    def test_get_single_user_not_found(self):
+    def test_get_single_user_not_found(self, api_client):
         user_id = 25
 
         with allure.step(f'Send GET request to retrieve details of user with ID {user_id}'):
-            response = requests.get(f'https://reqres.in/api/users/{user_id}')
+            response = api_client.get(f'/users/{user_id}')
 
         with allure.step('Verify that the response status code is 404'):
             assert response.status_code == 404, (
@@ -89,22 +107,22 @@ class TestGetUsers:
         with allure.step('Verify that the response JSON is empty'):
             assert response.json() == {}, 'There is an "Single User Not Found" GET ERROR: Data inconsistency'
 
-        allure.attach(response.text, name='Response JSON', attachment_type=allure.attachment_type.JSON)
+        attach(response.text, name='Response JSON', attachment_type=allure.attachment_type.JSON)
 
     @staticmethod
     @allure.feature('User Retrieval')
     @allure.story('Get delayed response')
     @allure.severity(allure.severity_level.MINOR)
     @allure.description('This test verifies that the API handles delayed responses correctly.')
-
-    def test_delayed_response():
-        list_data_info = UsedData.list_data_info
+    @pytest.mark.long_latency
+    @pytest.mark.no_cache
+    @pytest.mark.prefetch('GET', '/users?delay=3')
+    def test_delayed_response(api_client):
 
         with allure.step('Send GET request to retrieve list of users with delay'):
-            start_time = time.time()
-            response = requests.get(f'https://reqres.in/api/users?delay=3')
-            end_time = time.time()
-            elapsed_time = end_time - start_time
+            response = api_client.get('/users?delay=3')
+            # time of the request itself, not of waiting for a response started in the background
+            elapsed_time = response.elapsed.total_seconds()
 
         with allure.step('Verify that the response status code is 200'):
             assert response.status_code == 200, (
@@ -123,8 +141,8 @@ class TestGetUsers:
 
         response_data = response.json()
 
-        with allure.step('Check if the necessary information is present in the response'):
-            for info in list_data_info:
-                assert info in response_data, 'There is an "Delayed Response" GET ERROR: Needed information inconsistency.'
+        with allure.step('Check that the response matches the users list schema'):
+            violations = schemas.USER_LIST.errors(response_data)
+            assert not violations, f'There is an "Delayed Response" GET ERROR: Needed information inconsistency: {violations}'
 
-        allure.attach(response.text, name='Response JSON', attachment_type=allure.attachment_type.JSON)
\ No newline at end of file
+        attach(response.text, name='Response JSON', attachment_type=allure.attachment_type.JSON)
\ No newline at end of file
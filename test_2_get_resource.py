@@ -1,22 +1,25 @@
-import requests
 import pytest
 import allure
-from used_data import UsedData
+from attachments import attach
+import schemas
+from pagination import PageCrawler
 
 
 @pytest.mark.api
 @pytest.mark.regression
+@pytest.mark.latency_budget('/api/unknown', p95=1500)
+@pytest.mark.latency_budget('/api/unknown/{id}', p95=1500)
 class TestGetResource:
     @allure.feature('Resource Retrieval')
     @allure.story('Get list of resources')
     @allure.severity(allure.severity_level.CRITICAL)
     @allure.description('This test verifies that the API returns the list of resources correctly.')
-
-    def test_get_list_resources(self):
-        list_data_info = UsedData.list_data_info
+    @pytest.mark.produces('resource_id')
+    @pytest.mark.prefetch('GET', '/unknown')
+    def test_get_list_resources(self, api_client, chain):
 
         with allure.step('Send GET request to retrieve list of resources'):
-            response = requests.get('https://reqres.in/api/unknown')
+            response = api_client.get('/unknown')
 
         with allure.step('Verify that the response status code is 200'):
             assert response.status_code == 200, (
@@ -25,13 +28,32 @@ class TestGetResource:
 
         response_data = response.json()
 
-        with allure.step('Check if the necessary information is present in the response'):
-            for info in list_data_info:
-                assert info in response_data, f'There is an "List of Resources" GET ERROR: {info} inconsistency.'
+        with allure.step('Check that the response matches the resources list schema'):
+            violations = schemas.RESOURCE_LIST.errors(response_data)
+            assert not violations, f'There is an "List of Resources" GET ERROR: {violations} inconsistency.'
 
         if response_data['data'] is not None:
-            UsedData.resource_id = response_data['data'][0]['id']
-        allure.attach(response.text, name='Response JSON', attachment_type=allure.attachment_type.JSON)
+            chain.publish('resource_id', response_data['data'][0]['id'])
+        attach(response.text, name='Response JSON', attachment_type=allure.attachment_type.JSON)
+
+
+    @allure.feature('Resource Retrieval')
+    @allure.story('Get all pages of resources')
+    @allure.severity(allure.severity_level.NORMAL)
+    @allure.description('This test verifies that every page of the resources list is consistent and matches the schema.')
+
+    def test_get_all_resources_pages(self, api_client):
+        crawler = PageCrawler(api_client, '/unknown', schemas.RESOURCE_LIST)
+
+        with allure.step('Fetch every page of the resources list'):
+            items_seen, violations = crawler.crawl()
+
+        with allure.step('Verify that the whole collection is consistent'):
+            assert items_seen > 0, 'There is an "All Resources Pages" GET ERROR: no resources were served.'
+            assert not violations, f'There is an "All Resources Pages" GET ERROR: Data inconsistency: {violations}'
+
+        attach(f'{items_seen} resources on {crawler.pages_fetched} pages', name='Crawl summary',
+               attachment_type=allure.attachment_type.TEXT)
 
 
     @allure.feature('Resource Retrieval')
@@ -40,12 +62,10 @@ class TestGetResource:
     @allure.description(
         'This test verifies that the API returns the details of a single resource correctly for the specified resource ID.')
 
-    def test_get_single_resource(self):
-        resource_data_info = UsedData.resource_data_info
-        resource_id = UsedData.resource_id
+    def test_get_single_resource(self, api_client, resource_id):
 
         with allure.step(f'Send GET request to retrieve details of resource with ID {resource_id}'):
-            response = requests.get(f'https://reqres.in/api/unknown/{resource_id}')
+            response = api_client.get(f'/unknown/{resource_id}')
 
         with allure.step('Verify that the response status code is 200'):
             assert response.status_code == 200, (
@@ -54,23 +74,25 @@ class TestGetResource:
 
         response_data = response.json()
 
-        with allure.step('Check if the necessary resource information is present in the response'):
-            for info in resource_data_info:
-                assert info in response_data['data'], 'There is an "Single Resource" GET ERROR: Data inconsistency'
+        with allure.step('Check that the response matches the single resource schema'):
+            violations = schemas.SINGLE_RESOURCE.errors(response_data)
+            assert not violations, f'There is an "Single Resource" GET ERROR: Data inconsistency: {violations}'
 
-        allure.attach(response.text, name='Response JSON', attachment_type=allure.attachment_type.JSON)
+        attach(response.text, name='Response JSON', attachment_type=allure.attachment_type.JSON)
 
 
     @allure.feature('Resource Retrieval')
     @allure.story('Get single resource not found')
     @allure.severity(allure.severity_level.NORMAL)
     @allure.description('This test verifies that the API returns a 404 status code when a resource is not found.')
+    @pytest.mark.prefetch('GET', '/unknown/25')
+    @pytest.mark.no_cache
 
-    def test_get_single_resource_not_found(self):
+    def test_get_single_resource_not_found(self, api_client):
         resource_id = 25
 
         with allure.step(f'Send GET request to retrieve details of resource with ID {resource_id}'):
-            response = requests.get(f'https://reqres.in/api/unknown/{resource_id}')
+            response = api_client.get(f'/unknown/{resource_id}')
 
         with allure.step('Verify that the response status code is 404'):
             assert response.status_code == 404, (
@@ -80,7 +102,7 @@ class TestGetResource:
         with allure.step('Verify that the response JSON is empty'):
             assert response.json() == {}, 'There is an "Single Resource Not Found" GET ERROR: Data inconsistency'
 
-        allure.attach(response.text, name='Response JSON', attachment_type=allure.attachment_type.JSON)
+        attach(response.text, name='Response JSON', attachment_type=allure.attachment_type.JSON)
 
 
 
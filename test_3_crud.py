@@ -1,27 +1,27 @@
-import requests
 import pytest
 import allure
-from used_data import UsedData
+from attachments import attach
 
 
 @pytest.mark.api
 @pytest.mark.regression
 @pytest.mark.smoke
+@pytest.mark.latency_budget('/api/users', p95=1500)
+@pytest.mark.latency_budget('/api/users/{id}', p95=1500)
 class TestCRUD:
     @allure.feature('User Creation')
     @allure.story('Create a new user')
     @allure.severity(allure.severity_level.CRITICAL)
     @allure.description('This test verifies that a new user is created successfully via a POST request.')
-
-    def test_post_create_user(self):
+    @pytest.mark.produces('created_user_id')
+    def test_post_create_user(self, api_client, chain):
         user_data = {
             "name": "morpheus",
             "job": "leader"
         }
-        headers = {'Content-Type': 'application/json'}
 
         with allure.step('Send POST request to create a new user'):
-            response = requests.post('https://reqres.in/api/users', headers=headers, json=user_data)
+            response = api_client.post('/users', json=user_data)
 
         with allure.step('Verify that the response status code is 201'):
             assert response.status_code == 201, (
@@ -38,9 +38,9 @@ class TestCRUD:
             assert response_data.get('id') is not None, 'There is an "User Created" POST ERROR: user "id" was not created.'
             assert response_data.get(
                 'createdAt') is not None, 'There is an "User Created" POST ERROR: "createdAt" was not created.'
-        UsedData.created_user_id = response_data['id']
+        chain.publish('created_user_id', response_data['id'])
 
-        allure.attach(response.text, name='Response JSON', attachment_type=allure.attachment_type.JSON)
+        attach(response.text, name='Response JSON', attachment_type=allure.attachment_type.JSON)
 
 
 
@@ -50,16 +50,15 @@ class TestCRUD:
     @allure.severity(allure.severity_level.CRITICAL)
     @allure.description('This test verifies that an existing user is updated successfully via a PUT request.')
 
-    def test_put_update_user(self):
-        user_id = UsedData.created_user_id
+    def test_put_update_user(self, api_client, created_user_id):
+        user_id = created_user_id
         user_data_update = {
             "name": "morpheus",
             "job": "zion resident"
         }
-        headers = {'Content-Type': 'application/json'}
 
         with allure.step(f'Send PUT request to update user with ID {user_id}'):
-            response = requests.put(f'https://reqres.in/api/users/{user_id}', headers=headers, json=user_data_update)
+            response = api_client.put(f'/users/{user_id}', json=user_data_update)
 
         with allure.step('Verify that the response status code is 200'):
             assert response.status_code == 200, (
@@ -74,7 +73,7 @@ class TestCRUD:
             assert response_data['job'] == user_data_update[
                 'job'], 'There is an "User Update" PUT ERROR: "job" field is incorrect.'
 
-        allure.attach(response.text, name='Response JSON', attachment_type=allure.attachment_type.JSON)
+        attach(response.text, name='Response JSON', attachment_type=allure.attachment_type.JSON)
 
 
     @allure.feature('User Update')
@@ -82,16 +81,15 @@ class TestCRUD:
     @allure.severity(allure.severity_level.CRITICAL)
     @allure.description('This test verifies that an existing user is updated successfully via a PATCH request.')
 
-    def test_patch_update_user(self):
-        user_id = UsedData.created_user_id
+    def test_patch_update_user(self, api_client, created_user_id):
+        user_id = created_user_id
         user_data_update = {
             "name": "morpheus",
             "job": "zion resident"
         }
-        headers = {'Content-Type': 'application/json'}
 
         with allure.step(f'Send PATCH request to update user with ID {user_id}'):
-            response = requests.patch(f'https://reqres.in/api/users/{user_id}', headers=headers, json=user_data_update)
+            response = api_client.patch(f'/users/{user_id}', json=user_data_update)
 
         with allure.step('Verify that the response status code is 200'):
             assert response.status_code == 200, (
@@ -106,7 +104,7 @@ class TestCRUD:
             assert response_data['job'] == user_data_update[
                 'job'], 'There is an "User Update" PATCH ERROR: "job" field is incorrect.'
 
-        allure.attach(response.text, name='Response JSON', attachment_type=allure.attachment_type.JSON)
+        attach(response.text, name='Response JSON', attachment_type=allure.attachment_type.JSON)
 
 
 
@@ -115,11 +113,11 @@ class TestCRUD:
     @allure.severity(allure.severity_level.CRITICAL)
     @allure.description('This test verifies that an existing user is deleted successfully via a DELETE request.')
 
-    def test_delete_user(self):
-        user_id = UsedData.created_user_id
+    def test_delete_user(self, api_client, created_user_id):
+        user_id = created_user_id
 
         with allure.step(f'Send DELETE request to delete user with ID {user_id}'):
-            response = requests.delete(f'https://reqres.in/api/users/{user_id}')
+            response = api_client.delete(f'/users/{user_id}')
 
         with allure.step('Verify that the response status code is 204'):
             assert response.status_code == 204, (
@@ -1,7 +1,7 @@
-import requests
+import json
 import pytest
 import allure
-from used_data import UsedData
+from attachments import attach
 
 class TestRegLog:
 
@@ -12,15 +12,15 @@ class TestRegLog:
     @pytest.mark.api
     @pytest.mark.regression
     @pytest.mark.smoke
-    def test_register_successful(self):
+    @pytest.mark.produces('token')
+    def test_register_successful(self, api_client, chain):
         registration_data = {
             "email": "eve.holt@reqres.in",
             "password": "pistol"
         }
-        headers = {'Content-Type': 'application/json'}
 
         with allure.step('Send POST request to register a new user'):
-            response = requests.post('https://reqres.in/api/register', headers=headers, json=registration_data)
+            response = api_client.post('/register', json=registration_data)
 
         with allure.step('Verify that the response status code is 200'):
             assert response.status_code == 200, (
@@ -32,10 +32,9 @@ class TestRegLog:
         with allure.step('Check if the user ID and token are present in the response'):
             assert 'id' in response_data and 'token' in response_data, 'There is an "Successful Registration" POST ERROR: "id" and "token" were not generated successfully.'
 
-        UsedData.register_id = response_data['id']
-        UsedData.token = response_data['token']
+        chain.publish('token', response_data['token'])
 
-        allure.attach(response.text, name='Response JSON', attachment_type=allure.attachment_type.JSON)
+        attach(response.text, name='Response JSON', attachment_type=allure.attachment_type.JSON)
 
 
     @allure.feature('User Registration')
@@ -44,14 +43,14 @@ class TestRegLog:
     @allure.description('This test verifies that an unsuccessful registration returns the correct error response.')
     @pytest.mark.api
     @pytest.mark.regression
-    def test_register_unsuccessful(self):
+    @pytest.mark.prefetch('POST', '/register', json={"email": "eve.holt@reqres.in"})
+    def test_register_unsuccessful(self, api_client):
         registration_data = {
             "email": "eve.holt@reqres.in"
         }
-        headers = {'Content-Type': 'application/json'}
 
         with allure.step('Send POST request to register a new user'):
-            response = requests.post('https://reqres.in/api/register', headers=headers, json=registration_data)
+            response = api_client.post('/register', json=registration_data)
 
         with allure.step('Verify that the response status code is 400'):
             assert response.status_code == 400, (
@@ -62,7 +61,7 @@ class TestRegLog:
         with allure.step('Verify that user get error message'):
             assert 'error' in response_data and response_data['error'] == "Missing password", 'The user does not get correct ERROR MESSAGE'
 
-        allure.attach(response.text, name='Response JSON', attachment_type=allure.attachment_type.JSON)
+        attach(response.text, name='Response JSON', attachment_type=allure.attachment_type.JSON)
 
 
     @allure.feature('User Login')
@@ -72,15 +71,14 @@ class TestRegLog:
     @pytest.mark.api
     @pytest.mark.regression
     @pytest.mark.smoke
-    def test_login_successful(self):
+    def test_login_successful(self, api_client, token):
         login_data = {
             "email": "eve.holt@reqres.in",
             "password": "cityslicka"
         }
-        headers = {'Content-Type': 'application/json'}
 
         with allure.step('Send POST request to log in a user'):
-            response = requests.post('https://reqres.in/api/login', headers=headers, json=login_data)
+            response = api_client.post('/login', json=login_data)
 
         with allure.step('Verify that the response status code is 200'):
             assert response.status_code == 200, (
@@ -90,9 +88,9 @@ class TestRegLog:
         response_data = response.json()
 
         with allure.step('Check if the token is present in the response'):
-            assert 'token' in response_data and response_data['token'] == UsedData.token, 'There is an "LOGIN - SUCCESSFUL" POST ERROR: token was not generated correctly'
+            assert 'token' in response_data and response_data['token'] == token, 'There is an "LOGIN - SUCCESSFUL" POST ERROR: token was not generated correctly'
 
-        allure.attach(response.text, name='Response JSON', attachment_type=allure.attachment_type.JSON)
+        attach(response.text, name='Response JSON', attachment_type=allure.attachment_type.JSON)
 
 
     @allure.feature('User Login')
@@ -101,14 +99,14 @@ class TestRegLog:
     @allure.description('This test verifies that an unsuccessful login returns the correct error response.')
     @pytest.mark.api
     @pytest.mark.regression
-    def test_login_unsuccessful(self):
+    @pytest.mark.prefetch('POST', '/login', json={"email": "eve.holt@reqres.in"})
+    def test_login_unsuccessful(self, api_client):
         login_data = {
             "email": "eve.holt@reqres.in"
         }
-        headers = {'Content-Type': 'application/json'}
 
         with allure.step('Send POST request to log in a user'):
-            response = requests.post('https://reqres.in/api/login', headers=headers, json=login_data)
+            response = api_client.post('/login', json=login_data)
 
         with allure.step('Verify that the response status code is 400'):
             assert response.status_code == 400, (
@@ -120,5 +118,65 @@ class TestRegLog:
         with allure.step('Check if the error message is present in the response'):
             assert 'error' in response_data and response_data['error'] == "Missing password", 'There is an "LOGIN - UNSUCCESSFUL" POST ERROR: error message was not generated correctly'
 
-        allure.attach(response.text, name='Response JSON', attachment_type=allure.attachment_type.JSON)
+        attach(response.text, name='Response JSON', attachment_type=allure.attachment_type.JSON)
 
+
+
+    @allure.feature('User Registration')
+    @allure.story('Register with data-driven cases')
+    @allure.severity(allure.severity_level.NORMAL)
+    @allure.description('This test verifies the registration response for every case in cases/register.jsonl.')
+    @pytest.mark.api
+    @pytest.mark.regression
+    @pytest.mark.cases('cases/register.jsonl')
+    def test_register_cases(self, api_client, case):
+        attach(json.dumps(case['body']), name='Request JSON', attachment_type=allure.attachment_type.JSON)
+
+        with allure.step('Send POST request to register a user'):
+            response = api_client.post('/register', json=case['body'])
+
+        with allure.step(f'Verify that the response status code is {case["status"]}'):
+            assert response.status_code == case['status'], (
+                f'There is an "Registration Case" POST ERROR: Expected Status Code {case["status"]}, but got {response.status_code}'
+            )
+
+        response_data = response.json()
+
+        if 'error' in case:
+            with allure.step('Verify that user get error message'):
+                assert response_data.get('error') == case['error'], 'There is an "Registration Case" POST ERROR: error message was not generated correctly'
+        else:
+            with allure.step('Check if the user ID and token are present in the response'):
+                assert 'id' in response_data and 'token' in response_data, 'There is an "Registration Case" POST ERROR: "id" and "token" were not generated successfully.'
+
+        attach(response.text, name='Response JSON', attachment_type=allure.attachment_type.JSON)
+
+
+    @allure.feature('User Login')
+    @allure.story('Login with data-driven cases')
+    @allure.severity(allure.severity_level.NORMAL)
+    @allure.description('This test verifies the login response for every case in cases/login.jsonl.')
+    @pytest.mark.api
+    @pytest.mark.regression
+    @pytest.mark.cases('cases/login.jsonl')
+    def test_login_cases(self, api_client, case):
+        attach(json.dumps(case['body']), name='Request JSON', attachment_type=allure.attachment_type.JSON)
+
+        with allure.step('Send POST request to log in a user'):
+            response = api_client.post('/login', json=case['body'])
+
+        with allure.step(f'Verify that the response status code is {case["status"]}'):
+            assert response.status_code == case['status'], (
+                f'There is an "LOGIN - CASE" POST ERROR: Expected Status Code {case["status"]}, but got {response.status_code}'
+            )
+
+        response_data = response.json()
+
+        if 'error' in case:
+            with allure.step('Check if the error message is present in the response'):
+                assert response_data.get('error') == case['error'], 'There is an "LOGIN - CASE" POST ERROR: error message was not generated correctly'
+        else:
+            with allure.step('Check if the token is present in the response'):
+                assert 'token' in response_data, 'There is an "LOGIN - CASE" POST ERROR: token was not generated correctly'
+
+        attach(response.text, name='Response JSON', attachment_type=allure.attachment_type.JSON)
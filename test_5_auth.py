@@ -0,0 +1,94 @@
+import json
+import time
+import pytest
+import allure
+from attachments import attach
+from auth import AuthProvider
+from locks import file_lock
+
+STALE_TOKEN = 'expired-token'
+
+
+class TestAuth:
+
+    @allure.feature('Authentication')
+    @allure.story('Call a protected endpoint with the session token')
+    @allure.severity(allure.severity_level.CRITICAL)
+    @allure.description('This test verifies that the shared auth provider logs in once and authorizes requests.')
+    @pytest.mark.api
+    @pytest.mark.smoke
+    @pytest.mark.stand_in
+    def test_authorized_request(self, auth):
+        with allure.step('Send GET request with the bearer token of the session'):
+            response = auth.get('/session')
+
+        with allure.step('Verify that the response status code is 200'):
+            assert response.status_code == 200, (
+                f'There is an "Authorized Request" GET ERROR: Expected Status Code 200, but got {response.status_code}'
+            )
+
+        with allure.step('Check that the session belongs to the logged in user'):
+            assert response.json()['data']['email'] == auth.credentials['email'], 'There is an "Authorized Request" GET ERROR: the session belongs to another user'
+
+        attach(response.text, name='Response JSON', attachment_type=allure.attachment_type.JSON)
+
+    @allure.feature('Authentication')
+    @allure.story('Refresh a stale token')
+    @allure.severity(allure.severity_level.NORMAL)
+    @allure.description('This test verifies that a 401 for a stale cached token triggers one login and a retry.')
+    @pytest.mark.api
+    @pytest.mark.regression
+    @pytest.mark.stand_in
+    def test_stale_token_is_refreshed(self, api_client, auth):
+        provider = AuthProvider(api_client, auth.cache_path)
+
+        with allure.step('Leave a token the API no longer accepts in the shared token cache'):
+            with file_lock(f'{provider.cache_path}.lock'):
+                try:
+                    with open(provider.cache_path) as cache:
+                        entries = json.load(cache)
+                except (OSError, ValueError):
+                    entries = {}
+                entries[provider.cache_key] = {'token': STALE_TOKEN, 'expires_at': time.time() + 60}
+                with open(provider.cache_path, 'w') as cache:
+                    json.dump(entries, cache)
+
+        with allure.step('Send GET request with the cached token'):
+            response = provider.get('/session')
+
+        with allure.step('Verify that the request was retried with a fresh token'):
+            assert response.status_code == 200, (
+                f'There is an "Stale Token" GET ERROR: Expected Status Code 200 after the retry, but got {response.status_code}'
+            )
+            assert provider.token() != STALE_TOKEN, 'There is an "Stale Token" GET ERROR: the stale token was not replaced'
+
+        attach(response.text, name='Response JSON', attachment_type=allure.attachment_type.JSON)
+
+    @allure.feature('Authentication')
+    @allure.story('Renew an expired token')
+    @allure.severity(allure.severity_level.NORMAL)
+    @allure.description('This test verifies that a token is fetched again once its TTL has passed.')
+    @pytest.mark.api
+    @pytest.mark.regression
+    @pytest.mark.stand_in
+    @pytest.mark.long_latency
+    def test_token_expires_after_ttl(self, api_client, auth):
+        # registration credentials: a cache entry of its own, not the one of the session-wide provider
+        provider = AuthProvider(api_client, auth.cache_path, credentials={"email": "eve.holt@reqres.in", "password": "pistol"},
+                                ttl=0.2, endpoint='/register')
+
+        with allure.step('Obtain a token and wait for its TTL to pass'):
+            provider.token()
+            logins = provider.logins
+            time.sleep(0.25)
+
+        with allure.step('Send GET request after the TTL'):
+            response = provider.get('/session')
+
+        with allure.step('Verify that a new token was fetched and accepted'):
+            assert provider.logins == logins + 1, (
+                f'There is an "Token TTL" GET ERROR: Expected one new login after the TTL, but got {provider.logins - logins}'
+            )
+            assert response.status_code == 200, (
+                f'There is an "Token TTL" GET ERROR: Expected Status Code 200, but got {response.status_code}'
+            )
@@ -0,0 +1,256 @@
+"""Per-request phase timings and latency budgets.
+
+Every response sent through ApiClient carries ``response.timings``: seconds
+spent in TCP connect, TLS handshake, time to first byte, body download and
+JSON decoding, measured with ``time.perf_counter``. Connect and TLS are 0 when
+a pooled keep-alive connection was reused.
+
+The pytest plugin attaches the timings to the Allure step that sent the
+request, aggregates them per endpoint and enforces
+``@pytest.mark.latency_budget(endpoint, p95=<ms>, ...)`` at session end.
+
+PYTEST_DONT_REWRITE
+"""
+import json
+import re
+import time
+
+import allure
+import pytest
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+from attachments import attach
+
+PHASES = ('connect', 'tls', 'ttfb', 'download', 'json_decode', 'total')
+BUDGET_METRICS = ('p50', 'p90', 'p95', 'p99', 'max')
+ID_SEGMENT = re.compile(r'/\d+(?=/|$)')
+
+latency_recorder_key = pytest.StashKey()
+
+
+def endpoint_of(request):
+    """'GET /api/users/2?x=1' -> 'GET /api/users/{id}'."""
+    path = request.path_url.split('?', 1)[0]
+    return f'{request.method} {ID_SEGMENT.sub("/{id}", path)}'
+
+
+def percentile(sorted_values, fraction):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(int(round(fraction * len(sorted_values) + 0.5)) - 1, 0)
+    return sorted_values[min(rank, len(sorted_values) - 1)]
+
+
+def metric(sorted_values, name):
+    return sorted_values[-1] if name == 'max' else percentile(sorted_values, int(name[1:]) / 100)
+
+
+class _TimedConnectionMixin:
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.timings = {}
+        self._request_started = self._connected_at = 0.0
+
+    def _new_conn(self):
+        started = time.perf_counter()
+        sock = super()._new_conn()
+        self.timings['connect'] = time.perf_counter() - started
+        return sock
+
+    def connect(self):
+        started = time.perf_counter()
+        super().connect()
+        self._connected_at = time.perf_counter()
+        if isinstance(self, HTTPSConnection):
+            self.timings['tls'] = max(self._connected_at - started - self.timings.get('connect', 0.0), 0.0)
+
+    def request(self, *args, **kwargs):
+        self._request_started = time.perf_counter()
+        return super().request(*args, **kwargs)
+
+    def getresponse(self):
+        response = super().getresponse()
+        timings, self.timings = self.timings, {}
+        timings.setdefault('connect', 0.0)
+        timings.setdefault('tls', 0.0)
+        timings['ttfb'] = time.perf_counter() - max(self._request_started, self._connected_at)
+        response.timings = timings
+        return response
+
+
+class TimedHTTPConnection(_TimedConnectionMixin, HTTPConnection):
+    pass
+
+
+class TimedHTTPSConnection(_TimedConnectionMixin, HTTPSConnection):
+    pass
+
+
+class TimedHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = TimedHTTPConnection
+
+
+class TimedHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = TimedHTTPSConnection
+
+
+class TimedResponse(requests.Response):
+    def json(self, **kwargs):
+        started = time.perf_counter()
+        try:
+            return super().json(**kwargs)
+        finally:
+            self.timings['json_decode'] += time.perf_counter() - started
+
+
+class TimedAdapter(HTTPAdapter):
+    """HTTPAdapter whose pooled connections report phase timings."""
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {'http': TimedHTTPConnectionPool, 'https': TimedHTTPSConnectionPool}
+
+    def send(self, request, stream=False, **kwargs):
+        started = time.perf_counter()
+        response = super().send(request, stream=stream, **kwargs)
+        timings = dict.fromkeys(PHASES, 0.0)
+        timings.update(getattr(response.raw, 'timings', {}))
+        if not stream:
+            download_started = time.perf_counter()
+            response.content
+            timings['download'] = time.perf_counter() - download_started
+        timings['total'] = time.perf_counter() - started
+        response.__class__ = TimedResponse
+        response.timings = timings
+        return response
+
+
+class LatencyRecorder:
+    """Collects (nodeid, endpoint, timings) samples from the api_client fixture."""
+
+    def __init__(self):
+        self.samples = []
+        self.violations = []
+        self.current_item = None
+        # budgets reported by xdist workers, checked on the controller
+        self.worker_budgets = []
+
+    def on_response(self, response):
+        timings = getattr(response, 'timings', None)
+        if timings is None or response.request is None:
+            return
+        endpoint = endpoint_of(response.request)
+        nodeid = self.current_item.nodeid if self.current_item is not None else None
+        self.samples.append((nodeid, endpoint, timings))
+        attach(json.dumps({phase: round(timings[phase] * 1000, 3) for phase in PHASES}),
+               name=f'Timings {endpoint} (ms)', attachment_type=allure.attachment_type.JSON)
+
+    def by_endpoint(self, nodeids=None):
+        grouped = {}
+        for nodeid, endpoint, timings in self.samples:
+            if nodeids is None or nodeid in nodeids:
+                grouped.setdefault(endpoint, []).append(timings)
+        return grouped
+
+    def check_budgets(self, budgets):
+        """budgets: [(endpoint, {metric: ms}, nodeids)] -> list of violation messages."""
+        violations = []
+        for endpoint, limits, nodeids in budgets:
+            for name, samples in self.by_endpoint(nodeids).items():
+                if not budget_matches(endpoint, name):
+                    continue
+                totals = sorted(timings['total'] for timings in samples)
+                for metric_name, limit_ms in limits.items():
+                    actual_ms = metric(totals, metric_name) * 1000
+                    if actual_ms > limit_ms:
+                        violations.append(f'{name}: {metric_name} {actual_ms:.1f} ms exceeds budget of {limit_ms} ms '
+                                          f'over {len(totals)} request(s)')
+        return violations
+
+
+def budget_matches(budget, endpoint):
+    """'/api/users' matches any method on that path; 'GET /api/users' only GET."""
+    return endpoint == budget if ' ' in budget else endpoint.split(' ', 1)[1] == budget
+
+
+def collect_budgets(items, extra=()):
+    """Budgets of the marked items, merged with (endpoint, limits, nodeids) triples from xdist workers."""
+    budgets = {}
+    for item in items:
+        for marker in item.iter_markers('latency_budget'):
+            limits = {name: marker.kwargs[name] for name in BUDGET_METRICS if name in marker.kwargs}
+            if not marker.args or not limits:
+                raise pytest.UsageError(f'{item.nodeid}: latency_budget needs an endpoint and at least one of '
+                                        f'{", ".join(BUDGET_METRICS)}')
+            key = (marker.args[0], tuple(sorted(limits.items())))
+            budgets.setdefault(key, (marker.args[0], limits, set()))[2].add(item.nodeid)
+    for endpoint, limits, nodeids in extra:
+        key = (endpoint, tuple(sorted(limits.items())))
+        budgets.setdefault(key, (endpoint, dict(limits), set()))[2].update(nodeids)
+    return list(budgets.values())
+
+
+def pytest_addoption(parser):
+    parser.addoption('--timing-report', action='store_true', default=False,
+                     help='Print per-endpoint request phase timings at the end of the run')
+
+
+def pytest_configure(config):
+    config.addinivalue_line('markers', 'latency_budget(endpoint, p50=, p90=, p95=, p99=, max=): fail the run '
+                                       'when requests of the marked tests to endpoint exceed these milliseconds')
+    config.stash[latency_recorder_key] = LatencyRecorder()
+
+
+@pytest.hookimpl(hookwrapper=True)
+def pytest_runtest_call(item):
+    recorder = item.config.stash[latency_recorder_key]
+    recorder.current_item = item
+    yield
+    recorder.current_item = None
+
+
+@pytest.fixture(scope='session')
+def latency_recorder(request):
+    return request.config.stash[latency_recorder_key]
+
+
+@pytest.hookimpl(optionalhook=True)
+def pytest_testnodedown(node, error):
+    output = getattr(node, 'workeroutput', {})
+    recorder = node.config.stash[latency_recorder_key]
+    recorder.samples.extend(tuple(sample) for sample in output.get('latency_samples', ()))
+    recorder.worker_budgets.extend(output.get('latency_budgets', ()))
+
+
+def pytest_sessionfinish(session):
+    config = session.config
+    recorder = config.stash[latency_recorder_key]
+    if hasattr(config, 'workerinput'):
+        # each worker only sees its own requests; the controller checks the budgets over all of them
+        config.workeroutput['latency_samples'] = recorder.samples
+        config.workeroutput['latency_budgets'] = [(endpoint, limits, sorted(nodeids))
+                                                  for endpoint, limits, nodeids in collect_budgets(session.items)]
+        return
+    recorder.violations = recorder.check_budgets(collect_budgets(session.items, recorder.worker_budgets))
+    if recorder.violations and session.exitstatus == pytest.ExitCode.OK:
+        session.exitstatus = pytest.ExitCode.TESTS_FAILED
+
+
+def pytest_terminal_summary(terminalreporter, config):
+    recorder = config.stash[latency_recorder_key]
+    if config.getoption('--timing-report') and recorder.samples:
+        terminalreporter.section('request timings (ms)')
+        terminalreporter.write_line(f'{"endpoint":<28}{"n":>5}' + ''.join(f'{phase:>12}' for phase in PHASES)
+                                    + f'{"p95 total":>12}')
+        for endpoint, samples in sorted(recorder.by_endpoint().items()):
+            means = ''.join(f'{sum(t[phase] for t in samples) / len(samples) * 1000:>12.2f}' for phase in PHASES)
+            p95 = percentile(sorted(t['total'] for t in samples), 0.95) * 1000
+            terminalreporter.write_line(f'{endpoint:<28}{len(samples):>5}{means}{p95:>12.2f}')
+    if recorder.violations:
+        terminalreporter.section('latency budgets exceeded', red=True)
+        for violation in recorder.violations:
+            terminalreporter.write_line(violation, red=True)
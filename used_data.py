@@ -4,11 +4,4 @@ class UsedData:
     user_data_info = ['id', 'email', 'first_name', 'last_name', 'avatar']
     resource_data_info = ['id', 'name', 'year', 'color', 'pantone_value']
     support_info = ['url', 'text']
-    user_id = -1
-    resource_id = -1
-
-    created_user_id = -1
-
-    register_id = -1
-    token = ''
 